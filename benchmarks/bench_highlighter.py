@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+
+# This Python file uses the following encoding: utf-8
+
+# Highlight time of a 10k-line script: one regex per keyword/table (as
+# Highlighter used to do) against the lexer driven Highlighter
+#
+# QT_QPA_PLATFORM=offscreen python benchmarks/bench_highlighter.py
+
+import os
+import pathlib
+import re
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+root = pathlib.Path(__file__).parent.parent.absolute()
+sys.path.insert(0, str(root))
+
+from PySide6.QtCore import QRegularExpression
+from PySide6.QtGui import QColor, QTextCharFormat, QTextDocument
+from PySide6.QtWidgets import QApplication
+
+from editor.highlighter import Highlighter
+
+LINES = 10_000
+
+class LegacyHighlighter(Highlighter):
+    """One re.finditer per word, as before the compiled alternation"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._patterns = {}
+
+    def set_words(self, name, words, format):
+        for word in words:
+            self._patterns[fr'(\b{word}\b)'] = format
+
+    def set_format(self, kind, format):
+        pattern = {
+                'number': r"^\b(?=.)([+-]?([0-9]*)(\.([0-9]+))?)\b",
+                'comment': r'--.*$',
+                }[kind]
+        self._patterns[pattern] = format
+
+    def highlightBlock(self, text):
+        self.single = (QRegularExpression("\'"), None, 1, self._kinds['string'])
+        self.comment = (QRegularExpression("/\\*"), QRegularExpression("\\*/"),
+                        3, self._kinds['comment'])
+        pt = True
+        for pattern, format in self._patterns.items():
+            for match in re.finditer(pattern, text, re.MULTILINE):
+                if '--' in match.string:
+                    pt = False
+                start, end = match.span()
+                self.setFormat(start, end - start, format)
+
+        self.setCurrentBlockState(0)
+
+        if pt:
+            quotes_multiline =  self.match_multiline(text, *self.single)
+
+        comment_multiline = self.match_multiline(text, *self.comment)
+
+    def match_multiline(self, text, delimiter, endDelimiter, in_state, style):
+        if not endDelimiter:
+            endDelimiter = delimiter
+
+        if self.previousBlockState() == in_state:
+            start = 0
+            add = 0
+        else:
+            match = delimiter.match(text)
+            start = match.capturedStart()
+            add = match.capturedLength()
+
+        while start >= 0:
+            match = endDelimiter.match(text, start + add)
+            end =  match.capturedStart()
+            if end >= add:
+                length = end - start + match.capturedLength()
+                self.setCurrentBlockState(0)
+            else:
+                self.setCurrentBlockState(in_state)
+                length = len(text) - start + add
+
+            self.setFormat(start, length, style)
+            match = delimiter.match(text, start + length)
+            start = match.capturedStart()
+
+        return self.currentBlockState() == in_state
+
+def keywords() -> list:
+    with open(root / 'editor' / 'resources' / 'wordlist.txt') as f:
+        return [line.strip() for line in f if line.strip()]
+
+def tables(count: int=60) -> list:
+    names = ['urls', 'visits', 'keyword_search_terms', 'downloads', 'segments',
+             'meta', 'visit_source', 'content_annotations', 'clusters']
+    names += [f'table_{i}' for i in range(count - len(names))]
+    return names + [name.upper() for name in names]
+
+def script(lines: int=LINES) -> str:
+    body = [
+        "SELECT u.url, v.visit_time, count(*) AS n -- recent visits",
+        "FROM urls u JOIN visits v ON v.url = u.id",
+        "WHERE u.url LIKE '%music.youtube%' AND v.visit_time > 13300000000000000",
+        "GROUP BY u.url ORDER BY n DESC LIMIT 100;",
+        "/* keyword_search_terms",
+        "   lookup */ select term FROM keyword_search_terms where 1 = 1;",
+        ]
+    return '\n'.join(body[i % len(body)] for i in range(lines))
+
+def setup(highlighter: Highlighter) -> None:
+    fmt = QTextCharFormat()
+    fmt.setForeground(QColor('#0e1791'))
+    highlighter.set_words('keyword', keywords(), fmt)
+    highlighter.set_words('table', tables(), fmt)
+    highlighter.set_format('number', fmt)
+    highlighter.set_format('comment', fmt)
+
+def bench(highlighter_class) -> tuple:
+    document = QTextDocument()
+    document.setPlainText(script())
+    highlighter = highlighter_class()
+    setup(highlighter)
+    highlighter.setDocument(document)
+    st = time.perf_counter()
+    highlighter.rehighlight()
+    full = time.perf_counter() - st
+
+    # One keystroke: rehighlight a single block
+    block = document.findBlockByNumber(LINES // 2)
+    st = time.perf_counter()
+    for _ in range(200):
+        highlighter.rehighlightBlock(block)
+    keystroke = (time.perf_counter() - st) / 200
+    return full, keystroke
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+    for name, highlighter_class in (
+            ('one regex per word', LegacyHighlighter),
+            ('lexer + word lookup', Highlighter)):
+        full, keystroke = bench(highlighter_class)
+        print(f'{name:22} {LINES} lines={1000 * full:.0f}ms '
+              f'block={1000 * keystroke:.3f}ms')
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+
+# This Python file uses the following encoding: utf-8
+
+# Effect of the connection profiles (editor/db/db_profiles.py) on the scan
+# queries of Query.DEBUG_QUERY
+#
+# python benchmarks/bench_pragma_profile.py [rows]
+
+import os
+import pathlib
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent.absolute()))
+
+from editor.db.db_manager import Database
+from editor.db.db_profiles import PROFILES
+from editor.db.db_query import Query
+from editor.db.sql_lexer import split_statements
+from make_history import make_history
+
+# Visits of the synthetic History, urls are half of them
+ROWS = 1_000_000
+REPEAT = 5
+
+def run(con: sqlite3.Connection, statements: list) -> float:
+    st = time.perf_counter()
+    for statement in statements:
+        con.execute(statement.sql).fetchall()
+    return time.perf_counter() - st
+
+def bench(path: str, profile: str, statements: list) -> tuple:
+    """(cold, warm) times: first run on a new connection, then a re-run"""
+    cold = []
+    warm = []
+    for _ in range(REPEAT):
+        database = Database(path, profile=profile)
+        con = database.reader()
+        cold.append(run(con, statements))
+        warm.append(run(con, statements))
+        database.close()
+    return sorted(cold), sorted(warm)
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    statements = split_statements(Query.DEBUG_QUERY)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'History')
+        counts = make_history(path, rows)
+        print(f'urls: {counts["urls"]} rows, visits: {counts["visits"]} rows, '
+              f'{os.path.getsize(path) / 2**20:.1f} MiB')
+        for profile in PROFILES:
+            cold, warm = bench(path, profile, statements)
+            print(f'{profile:10} '
+                  f'cold median={1000 * cold[len(cold) // 2]:.1f}ms '
+                  f'warm median={1000 * warm[len(warm) // 2]:.1f}ms')
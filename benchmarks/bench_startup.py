@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+# This Python file uses the following encoding: utf-8
+
+# Cold start of the editor, every run in a new process (offscreen platform):
+# time to first paint of the editor and time to interactive (keywords and
+# schema loaded, MainWindow.ready)
+#
+# python benchmarks/bench_startup.py [runs] [tables]
+
+import time
+
+START = time.perf_counter()
+
+import json
+import os
+import pathlib
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+ROOT = pathlib.Path(__file__).parent.parent.absolute()
+sys.path.insert(0, str(ROOT))
+
+RUNS = 10
+TABLES = 300
+
+def make_schema(path: str, tables: int) -> None:
+    con = sqlite3.connect(path)
+    for i in range(tables):
+        columns = ', '.join(f'column_{j} INTEGER' for j in range(12))
+        con.execute(f'CREATE TABLE table_{i} (id INTEGER PRIMARY KEY, {columns})')
+        con.execute(f'CREATE INDEX table_{i}_column_0 ON table_{i} (column_0)')
+    con.commit()
+    con.close()
+
+def child(directory: str) -> None:
+    """One start, prints the timings as JSON"""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PySide6.QtCore import QEvent, QObject, QTimer
+    from PySide6.QtWidgets import QApplication
+
+    from editor.db import db_connection
+    # MainWindow opens {script_path}/History
+    db_connection.script_path = directory
+    from editor.sqlcode_editor import MainWindow
+    imported = time.perf_counter()
+
+    times = {'import': imported - START}
+
+    class FirstPaint(QObject):
+        def eventFilter(self, source, event):
+            if event.type() == QEvent.Paint and 'paint' not in times:
+                times['paint'] = time.perf_counter() - START
+            return False
+
+    app = QApplication(sys.argv)
+    with open(ROOT / 'style.qss', 'r') as qss:
+        app.setStyleSheet(qss.read())
+    window = MainWindow()
+    window.resize(1200, 600)
+    first_paint = FirstPaint()
+    window.completingTextEdit.viewport().installEventFilter(first_paint)
+
+    def ready():
+        times['interactive'] = time.perf_counter() - START
+        QTimer.singleShot(0, window.close)
+        QTimer.singleShot(0, app.quit)
+
+    window.ready.connect(ready)
+    window.show()
+    app.exec()
+    print(json.dumps(times))
+
+def median(values: list) -> float:
+    return sorted(values)[len(values) // 2]
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ['--child']:
+        child(sys.argv[2])
+        sys.exit()
+
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else RUNS
+    tables = int(sys.argv[2]) if len(sys.argv) > 2 else TABLES
+    with tempfile.TemporaryDirectory() as directory:
+        make_schema(os.path.join(directory, 'History'), tables)
+        env = dict(os.environ, XDG_CACHE_HOME=os.path.join(directory, 'cache'))
+        env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        results = []
+        for _ in range(runs):
+            out = subprocess.run(
+                    [sys.executable, __file__, '--child', directory],
+                    env=env, capture_output=True, text=True, check=True).stdout
+            results.append(json.loads(out.strip().splitlines()[-1]))
+
+    print(f'{runs} runs, {tables} tables (first run: schema cache empty)')
+    first = results[0]
+    print(f'first run   import={1000 * first["import"]:.0f}ms '
+          f'paint={1000 * first["paint"]:.0f}ms '
+          f'interactive={1000 * first["interactive"]:.0f}ms')
+    for name in ('import', 'paint', 'interactive'):
+        print(f'{name:12}median={1000 * median([r[name] for r in results]):.0f}ms')
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+# This Python file uses the following encoding: utf-8
+
+# Table names found in pasted text: one substring search per name (the
+# textPasted of before) against db_schema.TableMatcher
+#
+# python benchmarks/bench_table_match.py [tables] [paste MiB]
+
+import pathlib
+import random
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent.absolute()))
+
+from editor.db.db_schema import TableMatcher
+
+TABLES = 500
+PASTE_MIB = 4
+REPEAT = 5
+
+def make_tables(count: int) -> list:
+    r = random.Random(0)
+    words = ['urls', 'visits', 'keyword', 'search', 'terms', 'downloads',
+             'segments', 'usage', 'meta', 'cluster', 'context', 'annotations',
+             'sync', 'typed', 'history', 'sources', 'content', 'chains']
+    tables = set()
+    while len(tables) < count:
+        tables.add('_'.join(r.sample(words, r.randint(1, 3))))
+    return sorted(tables)
+
+def make_paste(tables: list, size: int) -> str:
+    r = random.Random(1)
+    used = r.sample(tables, 20)
+    lines = []
+    total = 0
+    while total < size:
+        table = r.choice(used)
+        line = (f"SELECT id, url, title FROM {table} t "
+                f"WHERE t.visit_count > {r.randint(0, 100)} "
+                f"AND t.url LIKE '%{r.getrandbits(32):x}%';")
+        lines.append(line)
+        total += len(line) + 1
+    return '\n'.join(lines)
+
+def substring_search(table_list: list, text: str) -> set:
+    return {table for table in table_list if table in text}
+
+def timed(function, *args) -> tuple:
+    times = []
+    for _ in range(REPEAT):
+        st = time.perf_counter()
+        result = function(*args)
+        times.append(time.perf_counter() - st)
+    return sorted(times)[len(times) // 2], result
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else TABLES
+    mib = float(sys.argv[2]) if len(sys.argv) > 2 else PASTE_MIB
+    tables = make_tables(count)
+    text = make_paste(tables, int(mib * 2**20))
+    print(f'{len(tables)} tables, paste of {len(text) / 2**20:.1f} MiB')
+
+    # MainWindow.table_list: every name twice, lower and upper case
+    table_list = sorted(tables + [table.upper() for table in tables])
+    old, old_found = timed(substring_search, table_list, text)
+    print(f'substring search   median={1000 * old:.1f}ms found={len(old_found)}')
+
+    st = time.perf_counter()
+    matcher = TableMatcher(tables)
+    build = time.perf_counter() - st
+    new, new_found = timed(matcher.find, text)
+    print(f'TableMatcher       median={1000 * new:.1f}ms found={len(new_found)} '
+          f'(built in {1000 * build:.1f}ms)')
+    # Substrings of longer names ('urls' in 'urls_typed') are not tables
+    print(f'false positives of the substring search: {len(old_found - new_found)}')
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+# This Python file uses the following encoding: utf-8
+
+# Scroll repaint time of CustomTableView on a 100k-row model
+#
+# QT_QPA_PLATFORM=offscreen python benchmarks/bench_table_view.py
+
+import datetime
+import os
+import pathlib
+import sqlite3
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent.absolute()))
+
+from PySide6 import QtGui
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QApplication, QTableView
+
+from editor.table_view import CustomTableView
+
+ROWS = 100_000
+STEPS = 200
+
+class LegacyTableView(CustomTableView):
+    """data() as it was before the per-column role caches"""
+    def data(self, index, role):
+        column = index.column()
+        row = index.row()
+        self.value = self.value_at(row, column)
+
+        if role == Qt.ForegroundRole:
+            if isinstance(self.value, int) or isinstance(self.value, float):
+                if self.value <= 0:
+                    return QtGui.QColor('red')
+            elif isinstance(self.value, datetime.datetime):
+                return QtGui.QColor('blue')
+            else:
+                return QtGui.QColor('#1c1b1c')
+
+        if role == Qt.BackgroundRole:
+            if self.value == None or self.value == '':
+                return QtGui.QColor('darkgray')
+
+        if role == Qt.TextAlignmentRole:
+            if isinstance(self.value, int):
+                return Qt.AlignVCenter | Qt.AlignRight
+
+        if role == Qt.DisplayRole:
+            if isinstance(self.value, datetime.datetime):
+                self.value = str(self.value)
+            return self.value
+
+def make_cursor(rows: int=ROWS) -> tuple:
+    con = sqlite3.connect(':memory:')
+    con.execute('CREATE TABLE urls(id INTEGER, url TEXT, title TEXT, '
+                'visit_count INTEGER, last_visit_time INTEGER, score REAL)')
+    con.executemany('INSERT INTO urls VALUES (?,?,?,?,?,?)', (
+        (i, f'https://example.org/{i % 977}', None if i % 7 == 0 else f'title {i}',
+         i % 13 - 2, 13_300_000_000_000_000 + i, i / 3) for i in range(rows)))
+    cursor = con.cursor()
+    cursor.execute('SELECT * FROM urls')
+    return [column[0] for column in cursor.description], cursor
+
+def bench(model_class, columnar: bool=False) -> dict:
+    model = model_class(make_cursor(), columnar=columnar)
+    while model.canFetchMore():
+        model.fetchMore()
+    view = QTableView()
+    view.resize(1000, 700)
+    view.setModel(model)
+    view.show()
+    QApplication.processEvents()
+
+    scroll = view.verticalScrollBar()
+    step = max(1, scroll.maximum() // STEPS)
+    times = []
+    for i in range(STEPS):
+        scroll.setValue(i * step)
+        st = time.perf_counter()
+        view.viewport().repaint()
+        times.append(time.perf_counter() - st)
+    view.close()
+    model.close()
+    times.sort()
+    return {
+            'rows': model.rowCount(),
+            'mean_ms': 1000 * sum(times) / len(times),
+            'p95_ms': 1000 * times[int(len(times) * 0.95)],
+            }
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+    for name, model_class, columnar in (
+            ('legacy data()', LegacyTableView, False),
+            ('role caches', CustomTableView, False),
+            ('role caches + columnar', CustomTableView, True)):
+        result = bench(model_class, columnar)
+        print(f'{name:24} rows={result["rows"]} '
+              f'mean={result["mean_ms"]:.2f}ms p95={result["p95_ms"]:.2f}ms')
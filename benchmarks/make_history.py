@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+
+# This Python file uses the following encoding: utf-8
+
+# Deterministic Chrome History generator: urls, visits, keyword_search_terms,
+# segments, segment_usage, downloads and meta with the Chrome schema, hosts
+# and URL popularity following a Zipf-like distribution and WebKit
+# timestamps (microseconds since 1601-01-01). The same rows and seed always
+# give the same database.
+#
+# python benchmarks/make_history.py PATH [rows] [--seed N]
+#   rows: visits (10k to 50M), urls are half of them
+
+from array import array
+
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+import sys
+import time
+
+ROWS = 100_000
+# Rows per executemany and per transaction
+BATCH = 500_000
+
+# Microseconds between 1601-01-01 and 1970-01-01
+WEBKIT_EPOCH = 11_644_473_600_000_000
+# Visits span the year before END
+END = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+SPAN = 365 * 86_400_000_000
+DAY = 86_400_000_000
+
+SCHEMA = '''
+CREATE TABLE meta(key LONGVARCHAR NOT NULL UNIQUE PRIMARY KEY, value LONGVARCHAR);
+CREATE TABLE urls(id INTEGER PRIMARY KEY AUTOINCREMENT,url LONGVARCHAR,title LONGVARCHAR,visit_count INTEGER DEFAULT 0 NOT NULL,typed_count INTEGER DEFAULT 0 NOT NULL,last_visit_time INTEGER NOT NULL,hidden INTEGER DEFAULT 0 NOT NULL);
+CREATE TABLE visits(id INTEGER PRIMARY KEY AUTOINCREMENT,url INTEGER NOT NULL,visit_time INTEGER NOT NULL,from_visit INTEGER,transition INTEGER DEFAULT 0 NOT NULL,segment_id INTEGER,visit_duration INTEGER DEFAULT 0 NOT NULL,incremented_omnibox_typed_score BOOLEAN DEFAULT FALSE NOT NULL,opener_visit INTEGER);
+CREATE TABLE keyword_search_terms (keyword_id INTEGER NOT NULL,url_id INTEGER NOT NULL,term LONGVARCHAR NOT NULL,normalized_term LONGVARCHAR NOT NULL);
+CREATE TABLE segments (id INTEGER PRIMARY KEY,name VARCHAR,url_id INTEGER NON NULL);
+CREATE TABLE segment_usage (id INTEGER PRIMARY KEY,segment_id INTEGER NOT NULL,time_slot INTEGER NOT NULL,visit_count INTEGER DEFAULT 0 NOT NULL);
+CREATE TABLE downloads (id INTEGER PRIMARY KEY,guid VARCHAR NOT NULL,current_path LONGVARCHAR NOT NULL,target_path LONGVARCHAR NOT NULL,start_time INTEGER NOT NULL,received_bytes INTEGER NOT NULL,total_bytes INTEGER NOT NULL,state INTEGER NOT NULL,danger_type INTEGER NOT NULL,interrupt_reason INTEGER NOT NULL,end_time INTEGER NOT NULL,opened INTEGER NOT NULL,referrer VARCHAR NOT NULL,tab_url VARCHAR NOT NULL,mime_type VARCHAR(255) NOT NULL);
+'''
+
+# Created once the rows are in, as Chrome names them
+INDEXES = '''
+CREATE INDEX urls_url_index ON urls (url);
+CREATE INDEX visits_url_index ON visits (url);
+CREATE INDEX visits_from_index ON visits (from_visit);
+CREATE INDEX visits_time_index ON visits (visit_time);
+CREATE INDEX keyword_search_terms_index1 ON keyword_search_terms (keyword_id, normalized_term);
+CREATE INDEX keyword_search_terms_index2 ON keyword_search_terms (url_id);
+CREATE INDEX keyword_search_terms_index3 ON keyword_search_terms (term);
+CREATE INDEX segments_name ON segments(name);
+CREATE INDEX segments_url_id ON segments(url_id);
+CREATE INDEX segment_usage_time_slot_segment_id ON segment_usage(time_slot, segment_id);
+CREATE INDEX segments_usage_seg_id ON segment_usage(segment_id);
+'''
+
+# Most visited first, followed by HOSTS generated ones
+POPULAR = [
+        'www.google.com', 'www.youtube.com', 'mail.google.com', 'github.com',
+        'stackoverflow.com', 'en.wikipedia.org', 'music.youtube.com',
+        'www.reddit.com', 'open.spotify.com', 'www.spotify.com',
+        'news.ycombinator.com', 'docs.python.org', 'www.amazon.com',
+        'twitter.com', 'www.linkedin.com', 'drive.google.com', 'www.netflix.com',
+        'doc.qt.io', 'www.sqlite.org', 'pypi.org', 'www.bbc.com', 'medium.com',
+        'developer.mozilla.org', 'calendar.google.com', 'www.twitch.tv',
+        ]
+HOSTS = 2_000
+WORDS = (
+        'python sqlite query table index history browser music video news '
+        'docs release guide install error linux window editor theme dark '
+        'review price weather football recipe travel flight hotel movie '
+        'series album live stream game update download tutorial example '
+        'api reference performance memory cache thread signal model view '
+        'delegate cursor schema column row export import chart map book'
+        ).split()
+SEARCH_HOSTS = {'www.google.com': 2, 'www.youtube.com': 3}
+# Visit transitions (core type, weight): LINK, TYPED, AUTO_BOOKMARK,
+# GENERATED, AUTO_TOPLEVEL, FORM_SUBMIT, RELOAD
+TRANSITIONS = [(0, 55), (1, 12), (2, 3), (5, 6), (6, 10), (7, 5), (8, 9)]
+# CHAIN_START | CHAIN_END qualifiers
+CHAIN = 0x30000000
+
+def zipf(r: random.Random, n: int) -> int:
+    """0 <= k < n, P(k) ~ 1/(k + 1)"""
+    return int(n ** r.random()) - 1
+
+def webkit_time(dt: datetime.datetime) -> int:
+    return WEBKIT_EPOCH + int(dt.timestamp() * 1_000_000)
+
+def hosts() -> list:
+    r = random.Random(0)
+    generated = []
+    while len(POPULAR) + len(generated) < HOSTS:
+        host = f'{r.choice(WORDS)}{r.choice(WORDS)}.{r.choice(["com", "org", "net", "io"])}'
+        if host not in POPULAR and host not in generated:
+            generated.append(host)
+    return POPULAR + generated
+
+def batches(total: int, start: int=1):
+    """(first id, last id + 1) of every BATCH"""
+    for first in range(start, start + total, BATCH):
+        yield first, min(first + BATCH, start + total)
+
+def make_history(path: str, rows: int=ROWS, seed: int=0, verbose: bool=False) -> dict:
+    """
+    path: str (must not exist)
+    rows: int (visits, urls are half of them)
+    seed: int
+
+    Return the number of rows of every table.
+    """
+    if os.path.exists(path):
+        raise FileExistsError(path)
+    r = random.Random(seed)
+    host_list = hosts()
+    url_count = max(1, rows // 2)
+    # Host of every url (index 0 unused), segment of a visit
+    url_host = array('H', [0])
+    end = webkit_time(END)
+    st = time.perf_counter()
+
+    def log(message):
+        if verbose:
+            print(f'{time.perf_counter() - st:8.1f}s {message}', file=sys.stderr)
+
+    con = sqlite3.connect(path, isolation_level=None)
+    con.execute('PRAGMA journal_mode = OFF')
+    con.execute('PRAGMA synchronous = OFF')
+    con.execute('PRAGMA cache_size = -262144')
+    con.executescript(SCHEMA)
+    con.executemany('INSERT INTO meta VALUES (?,?)', [
+            ('mmap_status', '-1'), ('version', '60'),
+            ('last_compatible_version', '16'),
+            ('early_expiration_threshold', str(end - 90 * DAY))])
+
+    # Bound methods and zipf() inlined in the row loops
+    random_, choices, getrandbits = r.random, r.choices, r.getrandbits
+    counts = {'meta': 4}
+    terms = 0
+    for first, last in batches(url_count):
+        urls = []
+        searches = []
+        for i in range(first, last):
+            host = int(len(host_list) ** random_()) - 1
+            url_host.append(host + 1)
+            name = host_list[host]
+            words = choices(WORDS, k=1 + int(4 * random_()))
+            if name in SEARCH_HOSTS and r.random() < 0.6:
+                term = ' '.join(words)
+                query = '/search?q=' if name == 'www.google.com' else '/results?search_query='
+                urls.append((i, f'https://{name}{query}{"+".join(words)}&ie={i:x}',
+                             f'{term} - {name.split(".")[1].title()}'))
+                searches.append((SEARCH_HOSTS[name], i, term, term.lower()))
+            else:
+                urls.append((i, f'https://{name}/{"/".join(words)}-{getrandbits(32):x}',
+                             ' '.join(words).title()))
+        con.execute('BEGIN')
+        con.executemany('INSERT INTO urls(id, url, title, last_visit_time) VALUES (?,?,?,0)', urls)
+        con.executemany('INSERT INTO keyword_search_terms VALUES (?,?,?,?)', searches)
+        con.execute('COMMIT')
+        terms += len(searches)
+        log(f'urls {last - 1}/{url_count}')
+    counts['urls'] = url_count
+    counts['keyword_search_terms'] = terms
+
+    kinds = [kind for kind, _ in TRANSITIONS]
+    cum_weights = []
+    for _, weight in TRANSITIONS:
+        cum_weights.append(weight + (cum_weights[-1] if cum_weights else 0))
+    step = max(1, SPAN // max(1, rows))
+    start = end - SPAN
+    for first, last in batches(rows):
+        transitions = r.choices(kinds, cum_weights=cum_weights, k=last - first)
+        visits = []
+        for i, kind in zip(range(first, last), transitions):
+            url = int(url_count ** random_())
+            visits.append((
+                    i, url, start + (i - 1) * step + int(step * random_()),
+                    i - 1 if kind == 0 and i > 1 else 0,
+                    kind if kind in (0, 8) else kind | CHAIN,
+                    url_host[url], int(600_000_000 * random_()) if kind != 8 else 0,
+                    int(kind == 1), 0))
+        con.execute('BEGIN')
+        con.executemany('INSERT INTO visits VALUES (?,?,?,?,?,?,?,?,?)', visits)
+        con.execute('COMMIT')
+        log(f'visits {last - 1}/{rows}')
+    counts['visits'] = rows
+
+    # One segment per host (its first url), visits per segment and day
+    con.execute('BEGIN')
+    con.execute('INSERT INTO segments(id, name, url_id) '
+                'SELECT segment_id, NULL, min(url) FROM visits GROUP BY segment_id')
+    con.executemany('UPDATE segments SET name = ? WHERE id = ?', (
+            (f'http://{host}/', i + 1) for i, host in enumerate(host_list)))
+    con.execute('INSERT INTO segment_usage(segment_id, time_slot, visit_count) '
+                f'SELECT segment_id, visit_time / {DAY} * {DAY} AS slot, count(*) '
+                'FROM visits GROUP BY slot, segment_id')
+    con.execute('COMMIT')
+    log('segments')
+
+    downloads = []
+    for i in range(1, rows // 200 + 1):
+        words = r.sample(WORDS, 2)
+        name = f'{"-".join(words)}-{r.getrandbits(16):x}.{r.choice(["pdf", "zip", "deb", "png"])}'
+        size = int(2 ** r.uniform(10, 30))
+        started = start + r.randrange(SPAN)
+        state = r.choices([1, 2, 4], [90, 6, 4])[0]
+        host = host_list[zipf(r, len(host_list))]
+        downloads.append((
+                i, f'{r.getrandbits(128):032x}', f'/home/user/Downloads/{name}',
+                f'/home/user/Downloads/{name}', started,
+                size if state == 1 else size // 2, size, state, 0,
+                0 if state == 1 else 40, started + size // 10, int(r.random() < 0.3),
+                f'https://{host}/', f'https://{host}/{"/".join(words)}',
+                'application/octet-stream'))
+    con.execute('BEGIN')
+    con.executemany(f'INSERT INTO downloads VALUES ({",".join("?" * 15)})', downloads)
+    con.execute('COMMIT')
+    counts['downloads'] = len(downloads)
+
+    con.executescript(INDEXES)
+    log('indexes')
+    # Visit statistics of the urls, as Chrome keeps them
+    con.execute('BEGIN')
+    con.execute('''
+        WITH stats AS (
+            SELECT url, count(*) AS visits, sum(transition & 255 = 1) AS typed,
+                   max(visit_time) AS last
+              FROM visits GROUP BY url)
+        UPDATE urls SET visit_count = stats.visits, typed_count = stats.typed,
+                        last_visit_time = stats.last
+          FROM stats WHERE stats.url = urls.id''')
+    con.execute('UPDATE urls SET hidden = 1 WHERE visit_count = 0')
+    con.execute('COMMIT')
+    con.execute('ANALYZE')
+    counts['segments'] = con.execute('SELECT count(*) FROM segments').fetchone()[0]
+    counts['segment_usage'] = con.execute('SELECT count(*) FROM segment_usage').fetchone()[0]
+    con.close()
+    log('done')
+    return counts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Synthetic Chrome History database')
+    parser.add_argument('path')
+    parser.add_argument('rows', nargs='?', type=int, default=ROWS,
+                        help=f'visits, urls are half of them (default {ROWS})')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    st = time.perf_counter()
+    counts = make_history(args.path, args.rows, args.seed, verbose=True)
+    for table, count in counts.items():
+        print(f'{table:22}{count:>12,}')
+    print(f'{os.path.getsize(args.path) / 2**20:.1f} MiB in {time.perf_counter() - st:.1f}s')
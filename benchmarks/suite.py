@@ -0,0 +1,307 @@
+#!/usr/bin/env python
+
+# This Python file uses the following encoding: utf-8
+
+# Benchmark suite of the hot paths: Query.query_exe, CustomTableView load
+# and scroll, Highlighter, TextEdit.getFirstVisibleBlockId, the completer
+# and opening a script. Reports latency percentiles and throughput and compares them
+# with a stored baseline (benchmarks/baseline.json)
+#
+# QT_QPA_PLATFORM=offscreen python benchmarks/suite.py [options] [case ...]
+#   --save       store the results as the new baseline
+#   --check      exit with 1 when a median regressed past --tolerance
+#   --tolerance  allowed median slowdown, in percent (default 25)
+#   --quick      fewer samples
+
+import argparse
+import json
+import os
+import pathlib
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+ROOT = pathlib.Path(__file__).parent.parent.absolute()
+sys.path.insert(0, str(ROOT))
+
+from make_history import make_history
+
+BASELINE = pathlib.Path(__file__).parent / 'baseline.json'
+# Visits of the synthetic History (make_history.py), urls are half of them
+ROWS = 100_000
+# Samples per case (--quick divides them by 5)
+SAMPLES = 50
+
+# Case name -> function(directory, samples) -> (seconds per sample, units per sample, unit)
+CASES = {}
+
+def case(name: str):
+    def register(function):
+        CASES[name] = function
+        return function
+    return register
+
+def percentile(values: list, p: float) -> float:
+    """Nearest-rank percentile"""
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(p / 100 * len(values)) - 1))]
+
+SCRIPT = '''
+SELECT * FROM urls WHERE url LIKE '%spotify%' ORDER BY last_visit_time DESC LIMIT 100;
+SELECT count(*) FROM visits;
+-- most visited hosts
+SELECT substr(url, 1, instr(substr(url, 9), '/') + 8) AS host, sum(visit_count)
+  FROM urls GROUP BY host ORDER BY 2 DESC;
+SELECT u.url, count(*) FROM visits v JOIN urls u ON u.id = v.url
+ GROUP BY u.id ORDER BY 2 DESC LIMIT 50;
+/* typed urls; */
+SELECT url, title FROM urls WHERE typed_count > 3 LIMIT 500;
+SELECT max(visit_time) - min(visit_time) FROM visits;
+'''
+
+@case('query_exe')
+def bench_query_exe(directory: str, samples: int) -> tuple:
+    from editor.db.db_query import Query
+    Query.CACHE = False
+    query = Query(db=os.path.join(directory, 'History'))
+    script = SCRIPT * 4
+    count = len(query.parse_query(script))
+    times = []
+    for _ in range(samples):
+        st = time.perf_counter()
+        for headers, cursor in query.query_exe(script):
+            cursor.fetchall()
+        times.append(time.perf_counter() - st)
+    query.close_connection()
+    return times, count, 'statements'
+
+@case('model_load')
+def bench_model_load(directory: str, samples: int) -> tuple:
+    from editor.table_view import CustomTableView
+    con = sqlite3.connect(os.path.join(directory, 'History'))
+    times = []
+    for _ in range(samples):
+        cursor = con.execute('SELECT * FROM urls')
+        st = time.perf_counter()
+        model = CustomTableView((['id', 'url', 'title', 'visit_count', 'typed_count',
+                                  'last_visit_time', 'hidden'], cursor))
+        times.append(time.perf_counter() - st)
+        model.close()
+    con.close()
+    return times, CustomTableView.ROW_BATCH_COUNT, 'rows'
+
+@case('model_scroll')
+def bench_model_scroll(directory: str, samples: int) -> tuple:
+    """One sample: fetchMore of a batch plus data() of every role of a screen of rows"""
+    from PySide6.QtCore import QModelIndex, Qt
+    from editor.table_view import CustomTableView
+    con = sqlite3.connect(os.path.join(directory, 'History'))
+    cursor = con.execute('SELECT * FROM urls')
+    model = CustomTableView(([d[0] for d in cursor.description], cursor))
+    roles = (Qt.DisplayRole, Qt.ForegroundRole, Qt.BackgroundRole, Qt.TextAlignmentRole)
+    screen = 40
+    times = []
+    for _ in range(samples * 10):
+        st = time.perf_counter()
+        model.fetchMore(QModelIndex())
+        first = max(0, model.rowCount() - screen)
+        for row in range(first, model.rowCount()):
+            for column in range(model.columnCount()):
+                index = model.index(row, column)
+                for role in roles:
+                    model.data(index, role)
+        times.append(time.perf_counter() - st)
+    columns = model.columnCount()
+    model.close()
+    con.close()
+    return times, screen * len(roles) * columns, 'data() calls'
+
+def script_lines(lines: int) -> str:
+    statements = [line for line in SCRIPT.splitlines() if line]
+    return '\n'.join(statements[i % len(statements)] for i in range(lines))
+
+@case('highlighter')
+def bench_highlighter(directory: str, samples: int) -> tuple:
+    from PySide6.QtGui import QTextCharFormat, QTextDocument
+    from editor.highlighter import Highlighter
+    lines = 5_000
+    keywords = (ROOT / 'editor' / 'resources' / 'wordlist.txt').read_text().split()
+    document = QTextDocument()
+    document.setPlainText(script_lines(lines))
+    highlighter = Highlighter()
+    highlighter.set_words('keyword', keywords, QTextCharFormat())
+    highlighter.set_words('table', ['urls', 'visits'], QTextCharFormat())
+    highlighter.set_format('number', QTextCharFormat())
+    highlighter.setDocument(document)
+    times = []
+    for _ in range(max(3, samples // 10)):
+        st = time.perf_counter()
+        highlighter.rehighlight()
+        times.append(time.perf_counter() - st)
+    return times, lines, 'lines'
+
+@case('first_visible_block')
+def bench_first_visible_block(directory: str, samples: int) -> tuple:
+    from editor.sqlcode_editor import TextEdit
+    editor = TextEdit()
+    editor.resize(800, 600)
+    editor.setPlainText(script_lines(100_000))
+    editor.show()
+    scroll_bar = editor.verticalScrollBar()
+    r = random.Random(0)
+    times = []
+    for _ in range(samples * 20):
+        scroll_bar.setValue(r.randint(0, scroll_bar.maximum()))
+        st = time.perf_counter()
+        editor.getFirstVisibleBlockId()
+        times.append(time.perf_counter() - st)
+    editor.close()
+    return times, 1, 'calls'
+
+def main_window(directory: str):
+    """MainWindow on {directory}/History, keywords and schema loaded"""
+    from PySide6.QtCore import QEventLoop, QTimer
+    from editor.db import db_connection
+    db_connection.script_path = directory
+    from editor.sqlcode_editor import MainWindow
+    window = MainWindow()
+    loop = QEventLoop()
+    window.ready.connect(loop.quit)
+    QTimer.singleShot(10000, loop.quit)
+    loop.exec()
+    window.completingTextEdit.setPlainText(
+            script_lines(2_000) + '\nSELECT  FROM urls u JOIN visits v ON v.url = u.id;')
+    return window
+
+@case('completer')
+def bench_completer(directory: str, samples: int) -> tuple:
+    """One sample: a keystroke's completer refresh (scope + ranked matches)"""
+    window = main_window(directory)
+    editor = window.completingTextEdit
+    cursor = editor.textCursor()
+    cursor.setPosition(editor.toPlainText().rindex('SELECT ') + len('SELECT '))
+    editor.setTextCursor(cursor)
+    model = window.completerModel
+    prefixes = ['u', 'v', 'vi', 'vis', 's', 'se', 'sel', 't', 'ti', 'l']
+    times = []
+    for i in range(samples * 10):
+        st = time.perf_counter()
+        scope, qualifier = editor.completionContext(0)
+        model.setPrefix(prefixes[i % len(prefixes)], True, scope, qualifier)
+        times.append(time.perf_counter() - st)
+    window.close()
+    return times, 1, 'refreshes'
+
+@case('add_column_data')
+def bench_add_column_data(directory: str, samples: int) -> tuple:
+    """One sample: MainWindow.addColumnData of a table not indexed yet"""
+    window = main_window(directory)
+    editor = window.completingTextEdit
+    cursor = editor.textCursor()
+    cursor.setPosition(editor.toPlainText().rindex('urls') + 2)
+    editor.setTextCursor(cursor)
+    times = []
+    for _ in range(samples):
+        window.all_tables = []
+        window.completerModel.setColumnSource(window.catalog.columns)
+        st = time.perf_counter()
+        window.addColumnData()
+        times.append(time.perf_counter() - st)
+    window.close()
+    return times, 1, 'tables'
+
+@case('open_file')
+def bench_open_file(directory: str, samples: int) -> tuple:
+    """
+    One sample: MainWindow.openFile of a script just under
+    MainWindow.LARGE_FILE_SIZE, the largest one opened in normal mode
+    (set and highlighted as a whole on the GUI thread)
+    """
+    from PySide6.QtWidgets import QApplication
+    from editor.sqlcode_editor import MainWindow
+    window = main_window(directory)
+    size = MainWindow.LARGE_FILE_SIZE - 1
+    text = script_lines(2_000) + '\n'
+    path = os.path.join(directory, 'script.sql')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write((text * (size // len(text) + 1))[:size])
+    times = []
+    for _ in range(max(3, samples // 10)):
+        st = time.perf_counter()
+        window.openFile(path)
+        QApplication.processEvents()
+        times.append(time.perf_counter() - st)
+        if window.completingTextEdit.large_file:
+            raise RuntimeError('script opened in large-file mode')
+        window.newFile()
+    window.close()
+    return times, size, 'bytes'
+
+def run(names: list, samples: int) -> dict:
+    from PySide6.QtWidgets import QApplication
+    from editor.db.db_metrics import metrics_log
+    # Benchmark statements are not worth logging
+    metrics_log.enabled = False
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['XDG_CACHE_HOME'] = os.path.join(directory, 'cache')
+        make_history(os.path.join(directory, 'History'), ROWS)
+        for name in names:
+            times, units, unit = CASES[name](directory, samples)
+            results[name] = {
+                    'samples': len(times),
+                    'median_ms': 1000 * percentile(times, 50),
+                    'p90_ms': 1000 * percentile(times, 90),
+                    'p99_ms': 1000 * percentile(times, 99),
+                    'throughput': units / percentile(times, 50),
+                    'unit': unit,
+                    }
+    return results
+
+def report(results: dict, baseline: dict, tolerance: float) -> list:
+    """Print the results, return the cases slower than baseline by more than tolerance %"""
+    regressions = []
+    print(f'{"case":22}{"median":>11}{"p90":>11}{"p99":>11}  throughput')
+    for name, result in results.items():
+        line = (f'{name:22}{result["median_ms"]:>9.3f}ms{result["p90_ms"]:>9.3f}ms'
+                f'{result["p99_ms"]:>9.3f}ms  {result["throughput"]:,.0f} {result["unit"]}/s')
+        if name in baseline:
+            change = 100 * (result['median_ms'] / baseline[name]['median_ms'] - 1)
+            line += f'  ({change:+.1f}% vs baseline)'
+            if change > tolerance:
+                regressions.append(name)
+                line += ' REGRESSION'
+        print(line)
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark suite')
+    parser.add_argument('cases', nargs='*', metavar='case',
+                        help=f'cases to run (default all: {", ".join(CASES)})')
+    parser.add_argument('--save', action='store_true')
+    parser.add_argument('--check', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=25.0)
+    parser.add_argument('--quick', action='store_true')
+    args = parser.parse_args()
+
+    unknown = set(args.cases) - set(CASES)
+    if unknown:
+        parser.error(f'unknown cases: {", ".join(sorted(unknown))}')
+    names = args.cases or list(CASES)
+    results = run(names, SAMPLES // 5 if args.quick else SAMPLES)
+
+    baseline = {}
+    if BASELINE.exists():
+        baseline = json.loads(BASELINE.read_text())
+    regressions = report(results, baseline, args.tolerance)
+    if args.save:
+        baseline.update(results)
+        BASELINE.write_text(json.dumps(baseline, indent=4, sort_keys=True) + '\n')
+        print(f'Baseline saved to {BASELINE}')
+    if args.check and regressions:
+        sys.exit(1)
@@ -0,0 +1,279 @@
+#!/usr/bin/env python
+
+# This Python file uses the following encoding: utf-8
+
+from PySide6.QtCore import (
+        QAbstractListModel,
+        QModelIndex,
+        Qt)
+
+try:
+    from .db.sql_lexer import iter_tokens
+except ImportError:
+    # sqlcode_editor.py executed as a script
+    from db.sql_lexer import iter_tokens
+
+# Key of the words stored at a trie node, children are single characters
+_WORDS = ''
+
+class PrefixTrie:
+    def __init__(self, words=()):
+        """
+        words: iterable (str)
+
+        Words are stored under their lower-case spelling, every node keeps
+        the original spellings ending there ('select' -> select, SELECT).
+        """
+        self._root = {}
+        self._count = 0
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str) -> bool:
+        """Return False when the word was already there"""
+        if not word:
+            return False
+        node = self._root
+        for char in word.lower():
+            node = node.setdefault(char, {})
+        words = node.setdefault(_WORDS, [])
+        if word in words:
+            return False
+        words.append(word)
+        self._count += 1
+        return True
+
+    def _node(self, prefix: str):
+        node = self._root
+        for char in prefix.lower():
+            node = node.get(char)
+            if node is None:
+                return None
+        return node
+
+    def match(self, prefix: str, limit: int=None, case_sensitive: bool=False) -> list:
+        """
+        Words starting with prefix, shortest first then alphabetically
+        (the order completer_list was sorted in). The trie is walked one
+        level (word length) at a time, so only the first limit words are
+        visited, nothing is sorted but the children of the visited nodes.
+        """
+        node = self._node(prefix)
+        if node is None:
+            return []
+        matches = []
+        level = [node]
+        while level:
+            next_level = []
+            for node in level:
+                for word in node.get(_WORDS, ()):
+                    if not case_sensitive or word.startswith(prefix):
+                        matches.append(word)
+                        if limit is not None and len(matches) >= limit:
+                            return matches
+                next_level.extend(node[char] for char in sorted(node) if char)
+            level = next_level
+        return matches
+
+    def __contains__(self, word: str) -> bool:
+        node = self._node(word)
+        return node is not None and word in node.get(_WORDS, ())
+
+    def __iter__(self):
+        return iter(self.match(''))
+
+    def __len__(self):
+        return self._count
+
+# Words ending a FROM clause, or following a table where an alias could be
+CLAUSE_WORDS = {
+        'where', 'on', 'using', 'group', 'order', 'limit', 'having', 'window',
+        'union', 'except', 'intersect', 'join', 'inner', 'left', 'right',
+        'full', 'outer', 'cross', 'natural', 'select', 'values', 'set',
+        'indexed', 'not', 'returning', 'offset',
+        }
+
+def unquote(identifier: str) -> str:
+    if identifier[:1] in ('"', '`', '['):
+        return identifier[1:-1]
+    return identifier
+
+def statement_scope(sql: str) -> dict:
+    """
+    sql: str (one statement)
+
+    Return the tables of the FROM/JOIN clauses (and UPDATE/INTO) by the
+    lower-case name they are referenced with: {'u': 'urls', 'urls':
+    'urls', 'visits': 'visits'} for 'FROM urls AS u JOIN visits'.
+    Subqueries are not resolved.
+    """
+    tokens = [(kind, sql[start:end]) for kind, start, end in iter_tokens(sql)
+              if kind in ('word', 'identifier', 'operator')]
+    scope = {}
+    in_from = False
+    expect = None
+    table = None
+    i = 0
+    while i < len(tokens):
+        kind, value = tokens[i]
+        lower = value.lower() if kind == 'word' else None
+        i += 1
+        if expect == 'table':
+            expect = None
+            if kind in ('word', 'identifier') and lower not in CLAUSE_WORDS:
+                table = unquote(value)
+                # schema.table
+                while i + 1 < len(tokens) and tokens[i][1] == '.' \
+                        and tokens[i + 1][0] in ('word', 'identifier'):
+                    table = unquote(tokens[i + 1][1])
+                    i += 2
+                scope[table.lower()] = table
+                expect = 'alias'
+                continue
+        elif expect == 'alias':
+            expect = None
+            if lower == 'as':
+                expect = 'alias'
+                continue
+            if kind == 'identifier' or (kind == 'word' and lower not in CLAUSE_WORDS):
+                scope[unquote(value).lower()] = table
+                continue
+        if lower in ('from', 'join', 'update', 'into'):
+            in_from = True
+            expect = 'table'
+        elif in_from and value == ',':
+            expect = 'table'
+        elif lower in CLAUSE_WORDS or value == '(':
+            in_from = False
+    return scope
+
+class ColumnIndex:
+    def __init__(self, columns=None):
+        """
+        columns: callable (table -> list of columns, SchemaCatalog.columns)
+
+        One PrefixTrie per table, built the first time the table is in the
+        scope of a completion and kept until the schema is reloaded.
+        """
+        self.columns = columns or (lambda table: [])
+        self._tries = {}
+
+    def trie(self, table: str) -> PrefixTrie:
+        key = table.lower()
+        trie = self._tries.get(key)
+        if trie is None:
+            columns = self.columns(table)
+            trie = self._tries[key] = PrefixTrie(
+                    [*columns, *(column.upper() for column in columns)])
+        return trie
+
+    def __contains__(self, table: str) -> bool:
+        return table.lower() in self._tries
+
+class CompletionModel(QAbstractListModel):
+
+    # Rows shown in the completer popup
+    LIMIT = 200
+
+    def __init__(self, words=(), parent=None):
+        """
+        words: iterable (str)
+
+        List model for a QCompleter in UnfilteredPopupCompletion mode: the
+        rows are the words matching the prefix (setPrefix), looked up in a
+        PrefixTrie. Adding words inserts them into the trie and updates
+        the rows in place, the model is never reset nor sorted again.
+
+        Columns are not words of the trie: only the columns of the tables
+        in scope (see setPrefix) are offered, looked up in a ColumnIndex, so
+        the candidates do not grow with every table used in a session.
+        """
+        super().__init__(parent)
+        self.trie = PrefixTrie(words)
+        self.column_index = ColumnIndex()
+        self.prefix = ''
+        self.case_sensitive = False
+        self.scope = {}
+        self.qualifier = None
+        self._matches = []
+
+    def words(self) -> list:
+        return list(self.trie)
+
+    def addWords(self, words) -> None:
+        added = [word for word in words if self.trie.add(word)]
+        if added and (self.prefix or self.qualifier is not None):
+            self._update()
+
+    def setWords(self, words) -> None:
+        """Replace every word (another database was opened)"""
+        self.trie = PrefixTrie(words)
+        self._update()
+
+    def setColumnSource(self, columns) -> None:
+        """columns: callable (table -> list of columns)"""
+        self.column_index = ColumnIndex(columns)
+
+    def setPrefix(self, prefix: str, case_sensitive: bool=False,
+                  scope: dict=None, qualifier: str=None) -> None:
+        """
+        prefix: str (word being typed)
+        case_sensitive: bool
+        scope: dict (statement_scope of the statement being edited)
+        qualifier: str (table or alias before the dot: 'u' in u.vis)
+        """
+        scope = scope or {}
+        if (prefix, case_sensitive, scope, qualifier) == \
+                (self.prefix, self.case_sensitive, self.scope, self.qualifier):
+            return
+        self.prefix = prefix
+        self.case_sensitive = case_sensitive
+        self.scope = scope
+        self.qualifier = qualifier
+        self._update()
+
+    def _candidates(self) -> list:
+        limit = CompletionModel.LIMIT
+        if self.qualifier is not None:
+            table = self.scope.get(self.qualifier.lower(), self.qualifier)
+            return self.column_index.trie(table).match(
+                    self.prefix, limit, self.case_sensitive)
+        if not self.prefix:
+            return []
+        # Columns in scope first, then keywords and tables
+        matches = []
+        for table in dict.fromkeys(self.scope.values()):
+            matches.extend(self.column_index.trie(table).match(
+                    self.prefix, limit, self.case_sensitive))
+        matches.extend(self.trie.match(self.prefix, limit, self.case_sensitive))
+        return list(dict.fromkeys(matches))[:limit]
+
+    def _update(self) -> None:
+        matches = self._candidates()
+        old, new = len(self._matches), len(matches)
+        if new < old:
+            self.beginRemoveRows(QModelIndex(), new, old - 1)
+            self._matches = matches
+            self.endRemoveRows()
+        elif new > old:
+            self.beginInsertRows(QModelIndex(), old, new - 1)
+            self._matches = matches
+            self.endInsertRows()
+        else:
+            self._matches = matches
+        if min(old, new):
+            self.dataChanged.emit(self.index(0), self.index(min(old, new) - 1))
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._matches)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        return self._matches[index.row()]
+
+if __name__ == "__main__":
+    print('Local [TEST]')
+    trie = PrefixTrie(['select', 'SELECT', 'selected', 'set', 'SET', 'session'])
+    print(trie.match('se'), trie.match('SE', case_sensitive=True), len(trie))
+    print(statement_scope('SELECT * FROM main.urls AS u JOIN "visits" v ON v.url = u.id'))
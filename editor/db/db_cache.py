@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+
+# This Python file uses the following encoding: utf-8
+
+# LRU cache of query results, keyed by the normalized statement text and
+# validated against the database version (see Database.version)
+
+from collections import OrderedDict
+
+import sqlite3
+import threading
+
+if __name__ == "__main__":
+    from sql_lexer import iter_tokens
+else:
+    from .sql_lexer import iter_tokens
+
+# Results of statements using these are never cached
+NONDETERMINISTIC = {
+        'random', 'randomblob', 'changes', 'total_changes',
+        'last_insert_rowid', 'current_time', 'current_date',
+        'current_timestamp',
+        }
+# Time values and modifiers of the date and time functions that depend on
+# the clock or the time zone, in any quotes: 'now', "now" (SQLite reads a
+# double-quoted name that is no column as a string)
+CLOCK_VALUES = {'now', 'localtime'}
+# Date and time functions read the clock when called without a time
+# value: date(), unixepoch(), strftime('%s')
+TIME_FUNCTIONS = {
+        'date', 'time', 'datetime', 'julianday', 'unixepoch', 'strftime',
+        }
+
+def _reads_clock(parts: list, i: int) -> bool:
+    """
+    parts: list (normalized tokens of a statement)
+    i: int (index of a TIME_FUNCTIONS name)
+
+    True when the function is called without a time value
+    """
+    if parts[i + 1:i + 2] != ['(']:
+        # A column or table named date
+        return False
+    # strftime(format, time-value, ...), the others take the time value first
+    time_argument = 2 if parts[i] == 'strftime' else 1
+    arguments = 0
+    depth = 0
+    for value in parts[i + 2:]:
+        if depth == 0 and value == ')':
+            break
+        if arguments == 0:
+            arguments = 1
+        if value == '(':
+            depth += 1
+        elif value == ')':
+            depth -= 1
+        elif value == ',' and depth == 0:
+            arguments += 1
+    return arguments < time_argument
+
+def normalize_sql(sql: str) -> str:
+    """
+    Statement text used as cache key: comments dropped, whitespace
+    collapsed and keywords/identifiers lower-cased, literals kept as is.
+    Return '' when the statement must not be cached.
+    """
+    parts = []
+    for kind, start, end in iter_tokens(sql):
+        if kind in ('whitespace', 'comment', 'comment_open'):
+            continue
+        value = sql[start:end]
+        if kind == 'word':
+            value = value.lower()
+        if value.lower() in NONDETERMINISTIC:
+            return ''
+        if kind in ('string', 'identifier') and value[1:-1].lower() in CLOCK_VALUES:
+            return ''
+        parts.append(value)
+    for i, value in enumerate(parts):
+        if value in TIME_FUNCTIONS and _reads_clock(parts, i):
+            return ''
+    return ' '.join(parts)
+
+def row_size(row: tuple) -> int:
+    """Approximate bytes held by a fetched row"""
+    size = 56 + 8 * len(row)
+    for value in row:
+        if isinstance(value, (str, bytes)):
+            size += 49 + len(value)
+        elif value is not None:
+            size += 24
+    return size
+
+class ResultCache:
+
+    # Total bytes of cached rows
+    MAX_BYTES = 64 * 2**20
+
+    def __init__(self, max_bytes: int=None):
+        self.max_bytes = max_bytes or ResultCache.MAX_BYTES
+        # A single result may use a quarter of the cache
+        self.max_entry = self.max_bytes // 4
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, version: tuple):
+        """Return (headers, rows) or None, stale entries are dropped"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, key: str, version: tuple, headers: list, rows: list,
+            nbytes: int) -> None:
+        if nbytes > self.max_entry:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (version, headers, rows, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def _remove(self, key: str) -> None:
+        self.nbytes -= self._entries.pop(key)[3]
+
+    def __len__(self):
+        return len(self._entries)
+
+class CachingCursor:
+    def __init__(self, cursor, cache: ResultCache, key: str, version: tuple,
+                 headers: list):
+        """
+        Wrap a cursor, keep the fetched rows and store them in the cache
+        once the cursor is exhausted (if they fit).
+        """
+        self.cursor = cursor
+        self.cache = cache
+        self.key = key
+        self.version = version
+        self.headers = headers
+        self.rows = []
+        self.nbytes = 0
+
+    def fetchmany(self, size: int) -> list:
+        try:
+            rows = self.cursor.fetchmany(size)
+        except sqlite3.Error:
+            # Interrupted (timeout, Cancel): the next fetch returns no rows,
+            # the result would look complete
+            self.rows = None
+            raise
+        if self.rows is not None:
+            self.rows.extend(rows)
+            self.nbytes += sum(map(row_size, rows))
+            if self.nbytes > self.cache.max_entry:
+                self.rows = None
+            elif len(rows) < size:
+                self.cache.put(self.key, self.version, self.headers,
+                               self.rows, self.nbytes)
+                self.rows = None
+        return rows
+
+    def close(self) -> None:
+        self.rows = None
+        self.cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+class CachedCursor:
+    def __init__(self, headers: list, rows: list):
+        """Cursor-like reader over a cached result"""
+        self.description = [(header,) + (None,) * 6 for header in headers]
+        self.rows = rows
+        self.position = 0
+
+    def fetchmany(self, size: int) -> list:
+        rows = self.rows[self.position:self.position + size]
+        self.position += len(rows)
+        return rows
+
+    def fetchall(self) -> list:
+        return self.fetchmany(len(self.rows))
+
+    def close(self) -> None:
+        self.rows = []
+
+if __name__ == "__main__":
+    print('LOCAL (TEST)')
+    print(normalize_sql("SELECT *\n  FROM Urls -- comment\nWHERE url LIKE '%A%'"))
+    print(repr(normalize_sql("SELECT datetime('now')")))
+    print(repr(normalize_sql("SELECT strftime('%s')")))
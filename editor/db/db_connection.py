@@ -7,17 +7,54 @@ import pathlib
 import sys
 import sqlite3
 
+if __name__ == "__main__":
+    from db_manager import manager
+else:
+    from .db_manager import manager
+
 script_path = pathlib.Path(__file__).parent.absolute()
 
 class DBConnection:
-    def __init__(self):
-        self.db = f'{script_path}/History'
-        self.con = sqlite3.connect(self.db)
+    # PRAGMA profile of new connections (db_profiles.PROFILES)
+    PROFILE = 'default'
+
+    def __init__(self, db: str=None, snapshot: bool=False, profile: str=None):
+        """
+        db: str (SQLite file, default editor/db/History)
+        snapshot: bool (query a read-only copy of db, for locked files)
+        profile: str (PRAGMA profile, default DBConnection.PROFILE)
+
+        Connections come from the shared db_manager.manager, self.con is
+        the writer, worker threads read through self.database.reader()
+        """
+        self.database = None
+        self.use_database(db or f'{script_path}/History', snapshot, profile)
+
+    def use_database(self, db: str, snapshot: bool=False, profile: str=None) -> None:
+        """
+        Switch to another database file. The new database is opened before
+        the current one is released: on sqlite3.Error (not a database, no
+        such directory) the current one stays in use.
+        """
+        database = manager.open(db, snapshot, profile or DBConnection.PROFILE)
+        try:
+            con = database.writer()
+            # Reads the header, fails on a file that is not a database
+            con.execute('PRAGMA schema_version').fetchone()
+        except sqlite3.Error:
+            manager.release(database)
+            raise
+        if self.database is not None:
+            self.close_connection()
+        self.db = db
+        self.database = database
+        self.con = con
         self.cursor = self.con.cursor()
 
     def close_connection(self):
         self.cursor.close()
-        self.con.close()
+        manager.release(self.database)
+        self.database = None
         print(f'{self.db} connection closed')
 
 if __name__ == "__main__":
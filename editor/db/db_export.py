@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+
+# This Python file uses the following encoding: utf-8
+
+# Export of a result set straight from its cursor to CSV, TSV, JSON Lines
+# or Parquet, CHUNK_ROWS rows at a time: memory does not grow with the
+# number of rows and nothing goes through the result grid
+
+import csv
+import json
+import os
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Rows fetched from the cursor and written at a time
+CHUNK_ROWS = 10_000
+
+# Format -> (file dialog filter, extension)
+FORMATS = {
+        'csv': ('CSV (*.csv)', '.csv'),
+        'tsv': ('TSV (*.tsv)', '.tsv'),
+        'jsonl': ('JSON Lines (*.jsonl)', '.jsonl'),
+        'parquet': ('Parquet (*.parquet)', '.parquet'),
+        }
+
+def available_formats() -> list:
+    """Formats that can be written here (Parquet needs pyarrow)"""
+    return [name for name in FORMATS if name != 'parquet' or pyarrow is not None]
+
+def format_for(path: str) -> str:
+    """Format of a file name by its extension (default csv)"""
+    extension = os.path.splitext(path)[1].lower()
+    for name, (_, format_extension) in FORMATS.items():
+        if extension == format_extension:
+            return name
+    return 'csv'
+
+def unique_names(headers: list) -> list:
+    """Column names as keys: the second 'id' of 'SELECT u.id, v.id' -> id_1"""
+    names = []
+    seen = set()
+    for header in headers:
+        name = header
+        i = 0
+        while name in seen:
+            i += 1
+            name = f'{header}_{i}'
+        seen.add(name)
+        names.append(name)
+    return names
+
+def _csv_row(row: tuple) -> tuple:
+    # BLOBs as hex instead of b'...'
+    return tuple(value.hex() if type(value) is bytes else value for value in row)
+
+def _json_default(value):
+    if isinstance(value, bytes):
+        return value.hex()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+class CSVWriter:
+    def __init__(self, path: str, headers: list, delimiter: str=','):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file, delimiter=delimiter)
+        self.writer.writerow(headers)
+
+    def write(self, rows: list) -> None:
+        self.writer.writerows(map(_csv_row, rows))
+
+    def close(self) -> None:
+        self.file.close()
+
+class JSONLinesWriter:
+    def __init__(self, path: str, headers: list):
+        """One object per row, BLOBs as hex"""
+        self.file = open(path, 'w', encoding='utf-8')
+        self.names = unique_names(headers)
+
+    def write(self, rows: list) -> None:
+        names = self.names
+        self.file.writelines(
+                json.dumps(dict(zip(names, row)), ensure_ascii=False,
+                           default=_json_default) + '\n'
+                for row in rows)
+
+    def close(self) -> None:
+        self.file.close()
+
+class ParquetWriter:
+    def __init__(self, path: str, headers: list):
+        """
+        One row group per chunk. SQLite columns are not typed, the Parquet
+        types are those of the first chunk: a column mixing types there, or
+        only NULL, is written as strings.
+        """
+        if pyarrow is None:
+            raise ImportError('pyarrow is required for Parquet export')
+        self.path = path
+        self.names = unique_names(headers)
+        self.schema = None
+        self.writer = None
+
+    def _column(self, name: str, values: list, type=None):
+        try:
+            return pyarrow.array(values, type=type)
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+            if type is not None and type != pyarrow.string():
+                raise ValueError(f'Column {name} mixes types, '
+                                 f'export it as CSV or JSON Lines') from None
+        return pyarrow.array([None if value is None else str(value) for value in values],
+                             type=pyarrow.string())
+
+    def write(self, rows: list) -> None:
+        columns = list(zip(*rows)) if rows else [()] * len(self.names)
+        if self.schema is None:
+            arrays = [self._column(name, list(values))
+                      for name, values in zip(self.names, columns)]
+            arrays = [pyarrow.array(array.to_pylist(), type=pyarrow.string())
+                      if array.type == pyarrow.null() else array for array in arrays]
+            self.schema = pyarrow.schema(
+                    [(name, array.type) for name, array in zip(self.names, arrays)])
+            self.writer = pyarrow.parquet.ParquetWriter(self.path, self.schema)
+        else:
+            arrays = [self._column(field.name, list(values), field.type)
+                      for field, values in zip(self.schema, columns)]
+        self.writer.write_table(pyarrow.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self) -> None:
+        if self.writer is None:
+            # No rows: an empty file with string columns
+            self.write([])
+        self.writer.close()
+
+def writer_for(fmt: str, path: str, headers: list):
+    if fmt == 'csv':
+        return CSVWriter(path, headers)
+    if fmt == 'tsv':
+        return CSVWriter(path, headers, delimiter='\t')
+    if fmt == 'jsonl':
+        return JSONLinesWriter(path, headers)
+    if fmt == 'parquet':
+        return ParquetWriter(path, headers)
+    raise ValueError(f'Unknown export format: {fmt}')
+
+def export_cursor(cursor, headers: list, path: str, fmt: str=None,
+                  chunk_rows: int=CHUNK_ROWS, progress=None, cancelled=None) -> int:
+    """
+    cursor: sqlite3.Cursor (or any cursor with fetchmany, e.g. MeasuredCursor)
+    headers: list
+    path: str
+    fmt: str (FORMATS key, default format_for(path))
+    progress: callable (rows written so far), called after every chunk
+    cancelled: callable (-> bool), checked before every chunk
+
+    The rows are written to path.part, renamed to path once they are all
+    written: a cancelled or failed export leaves no file behind. Return
+    the number of rows written, None when cancelled.
+    """
+    fmt = fmt or format_for(path)
+    part = f'{path}.part'
+    writer = writer_for(fmt, part, headers)
+    rows_written = 0
+    done = False
+    try:
+        while True:
+            if cancelled is not None and cancelled():
+                return None
+            rows = cursor.fetchmany(chunk_rows)
+            if rows:
+                writer.write(rows)
+                rows_written += len(rows)
+                if progress is not None:
+                    progress(rows_written)
+            if len(rows) < chunk_rows:
+                break
+        writer.close()
+        os.replace(part, path)
+        done = True
+    finally:
+        if not done:
+            try:
+                writer.close()
+            except Exception:
+                pass
+            if os.path.exists(part):
+                os.remove(part)
+    return rows_written
+
+if __name__ == "__main__":
+    print('LOCAL (TEST)')
+    import sqlite3
+    import tempfile
+    con = sqlite3.connect(':memory:')
+    cursor = con.execute("SELECT 1 AS id, 'a' AS id, x'00ff' AS blob")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'out.jsonl')
+        print(export_cursor(cursor, [d[0] for d in cursor.description], path))
+        print(open(path).read())
@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+
+# This Python file uses the following encoding: utf-8
+
+import os
+import pathlib
+import shutil
+import sqlite3
+import tempfile
+import threading
+
+if __name__ == "__main__":
+    from db_cache import ResultCache
+    from db_profiles import apply_profile, get_profile, profile_key
+    from db_schema import SchemaCatalog
+else:
+    from .db_cache import ResultCache
+    from .db_profiles import apply_profile, get_profile, profile_key
+    from .db_schema import SchemaCatalog
+
+class Database:
+
+    # Read connections kept per database (one per worker thread)
+    READERS = 4
+
+    def __init__(self, path: str, readers: int=None, snapshot: bool=False,
+                 profile='default'):
+        """
+        path: str (SQLite file)
+        readers: int (size of the read connection pool)
+        snapshot: bool (query a read-only copy, see take_snapshot)
+        profile: str | dict (PRAGMA profile, see db_profiles.py)
+
+        One writer connection, shared by every thread behind write_lock,
+        in autocommit mode (isolation_level=None: a statement is committed
+        unless the script opened a transaction with BEGIN), plus a small
+        pool of read connections, one per thread. Connections are opened
+        with check_same_thread=False because the pages of a result set are
+        fetched by another thread than the one that ran the statement
+        (query_worker.FetchWorker), a read connection is first detached
+        from the pool (see detach_reader).
+        """
+        self.path = path
+        self.readers = readers or Database.READERS
+        self.profile = profile
+        get_profile(profile)
+        self.snapshot = None
+        if snapshot:
+            self.snapshot = take_snapshot(path)
+        self.write_lock = threading.RLock()
+        self.cache = ResultCache()
+        self.users = 0
+        # Statements run on the writer, part of version()
+        self.writes = 0
+        self._readers = {}
+        # Read connections owned by result sets left open
+        self._detached = set()
+        self._writer = None
+        self._catalog = None
+        self._lock = threading.Lock()
+
+    def connect(self, reader: bool=True) -> sqlite3.Connection:
+        if self.snapshot is not None:
+            # The copy never changes, immutable=1 skips all file locking
+            uri = f'{pathlib.Path(self.snapshot).as_uri()}?mode=ro&immutable=1'
+            con = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                                  isolation_level=None)
+        else:
+            con = sqlite3.connect(self.path, check_same_thread=False,
+                                  isolation_level=None)
+        apply_profile(con, self.profile, reader, self.snapshot is not None)
+        return con
+
+    def writer(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._writer is None:
+                self._writer = self.connect(reader=False)
+            return self._writer
+
+    def reader(self) -> sqlite3.Connection:
+        """Read connection of the calling thread"""
+        ident = threading.get_ident()
+        with self._lock:
+            con = self._readers.get(ident)
+            if con is None:
+                if len(self._readers) < self.readers:
+                    con = self._readers[ident] = self.connect()
+                else:
+                    # Pool is full, share one of the existing connections
+                    connections = list(self._readers.values())
+                    con = connections[ident % len(connections)]
+            return con
+
+    def detach_reader(self, con: sqlite3.Connection) -> bool:
+        """
+        Hand con, the read connection of the calling thread, over to a
+        result set left open (its pages are fetched by another thread): the
+        next statements of the thread run on a new connection and never
+        wait on it. The progress handler stays, the pages keep the
+        statement timeout and Cancel. The owner closes it with
+        close_detached(). Return False when con is not the calling
+        thread's own (pool full, shared).
+        """
+        ident = threading.get_ident()
+        with self._lock:
+            if self._readers.get(ident) is not con:
+                return False
+            del self._readers[ident]
+            self._detached.add(con)
+        return True
+
+    def close_detached(self, con: sqlite3.Connection) -> None:
+        with self._lock:
+            if con not in self._detached:
+                # Already closed with the database
+                return
+            self._detached.discard(con)
+        con.close()
+
+    def schema(self) -> SchemaCatalog:
+        """
+        Tables, views and their columns (db_schema.py), shared by every
+        window on the database and read again once the schema changed.
+        """
+        schema_version = self.schema_version()
+        catalog = self._catalog
+        if catalog is None or catalog.schema_version != schema_version:
+            catalog = self._catalog = SchemaCatalog.load(self.reader(), self.path)
+        return catalog
+
+    def schema_version(self) -> int:
+        """PRAGMA schema_version, changes whenever a statement changes the schema"""
+        return self.reader().execute('PRAGMA schema_version').fetchone()[0]
+
+    def version(self) -> tuple:
+        """
+        Value that changes whenever the data may have changed: the writes
+        counter (statements run on the writer, DDL included), the writer's
+        PRAGMA data_version (commits by other processes) and total_changes,
+        and the mtime/size of the file and its -wal. Nothing of the read
+        connections is part of it: they are closed with the result sets
+        left open (detach_reader), the next ones are new connections.
+        """
+        if self.snapshot is not None:
+            # immutable=1, the copy never changes
+            return ('snapshot',)
+        stats = []
+        for suffix in ('', '-wal'):
+            try:
+                st = os.stat(f'{self.path}{suffix}')
+                stats.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stats.append(None)
+        with self.write_lock:
+            con = self.writer()
+            data_version = con.execute('PRAGMA data_version').fetchone()[0]
+            return (self.writes, data_version, con.total_changes, *stats)
+
+    def close(self) -> None:
+        self.cache.clear()
+        with self._lock:
+            for con in [*self._readers.values(), *self._detached]:
+                con.close()
+            self._readers.clear()
+            self._detached.clear()
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        if self.snapshot is not None:
+            shutil.rmtree(os.path.dirname(self.snapshot), ignore_errors=True)
+            self.snapshot = None
+
+def take_snapshot(path: str) -> str:
+    """
+    Copy a database into a temporary file with the sqlite3 backup API and
+    return the copy's path.
+
+    A database locked by another process (Chrome keeps its History file
+    open) cannot be read in place: the file and its -wal are copied first
+    and the backup is taken from that copy.
+    """
+    directory = tempfile.mkdtemp(prefix='sqldb-snapshot-')
+    target = os.path.join(directory, pathlib.Path(path).name)
+    source_uri = f'{pathlib.Path(path).resolve().as_uri()}?mode=ro'
+    try:
+        _backup(source_uri, target)
+    except sqlite3.OperationalError:
+        copy = os.path.join(directory, 'source')
+        for suffix in ('', '-wal'):
+            if os.path.exists(f'{path}{suffix}'):
+                shutil.copyfile(f'{path}{suffix}', f'{copy}{suffix}')
+        try:
+            _backup(pathlib.Path(copy).as_uri(), target)
+        except sqlite3.Error:
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+        finally:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(f'{copy}{suffix}'):
+                    os.remove(f'{copy}{suffix}')
+    return target
+
+def _backup(source_uri: str, target: str) -> None:
+    source = sqlite3.connect(source_uri, uri=True, timeout=1)
+    destination = sqlite3.connect(target)
+    try:
+        # backup() retries forever on a locked source, fail fast instead
+        source.execute('SELECT count(*) FROM sqlite_schema').fetchall()
+        source.backup(destination)
+    finally:
+        destination.close()
+        source.close()
+
+class ConnectionManager:
+    def __init__(self):
+        """Databases opened by the editor windows, keyed by (path, snapshot, profile)"""
+        self._databases = {}
+        self._lock = threading.Lock()
+
+    def open(self, path: str, snapshot: bool=False, profile='default') -> Database:
+        path = path if path == ':memory:' else str(pathlib.Path(path).resolve())
+        key = path, snapshot, profile_key(profile)
+        with self._lock:
+            database = self._databases.get(key)
+            if database is None:
+                database = self._databases[key] = Database(
+                        path, snapshot=snapshot, profile=profile)
+                database.key = key
+            database.users += 1
+            return database
+
+    def release(self, database: Database) -> None:
+        """Close the database once the last user releases it"""
+        with self._lock:
+            database.users -= 1
+            if database.users > 0:
+                return
+            self._databases.pop(database.key, None)
+        database.close()
+
+    def databases(self) -> list:
+        with self._lock:
+            return list(self._databases.values())
+
+    def close_all(self) -> None:
+        with self._lock:
+            databases = list(self._databases.values())
+            self._databases.clear()
+        for database in databases:
+            database.close()
+
+# Shared by every DBConnection
+manager = ConnectionManager()
+
+if __name__ == "__main__":
+    print('LOCAL (TEST)')
+    database = manager.open(f'{pathlib.Path(__file__).parent.absolute()}/History')
+    print(database.path, database.reader(), database.writer())
+    manager.release(database)
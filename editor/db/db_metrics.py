@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+
+# This Python file uses the following encoding: utf-8
+
+# Per-statement execution metrics: prepare time, time to first row, step
+# time, rows and bytes fetched and the time the editor took to render the
+# result, kept in memory and appended to a JSON-lines log
+
+from collections import deque
+
+import datetime
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+
+if __name__ == "__main__":
+    from db_cache import row_size
+else:
+    from .db_cache import row_size
+
+def log_path() -> pathlib.Path:
+    """$SQLDB_METRICS_LOG or ~/.cache/dmnix-sqldb/metrics.jsonl"""
+    path = os.environ.get('SQLDB_METRICS_LOG')
+    if path:
+        return pathlib.Path(path)
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return pathlib.Path(base, 'dmnix-sqldb', 'metrics.jsonl')
+
+class StatementMetrics:
+    def __init__(self, sql: str, database: str='', log=None):
+        """
+        sql: str
+        database: str (path of the database)
+        log: MetricsLog (default metrics_log)
+
+        Times are in seconds. prepare covers cursor.execute (SQLite
+        prepares the statement and steps to the first row), step every
+        sqlite3 call made for the statement, first_row the time from the
+        start to the first fetched row. The record is logged once the rows
+        are exhausted (or the cursor closed) and, when the result is shown,
+        once it is rendered.
+        """
+        self.sql = sql
+        self.database = database
+        self.log = log or metrics_log
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.prepare = None
+        self.first_row = None
+        self.step = 0.0
+        self.rows = 0
+        self.nbytes = 0
+        self.render = None
+        self.cached = False
+        self.error = None
+        self._done = False
+        self._render_pending = False
+        self._recorded = False
+        self._lock = threading.Lock()
+
+    def fetched(self, rows: list, seconds: float) -> None:
+        self.step += seconds
+        if rows:
+            if self.first_row is None:
+                self.first_row = time.perf_counter() - self.start
+            self.rows += len(rows)
+            self.nbytes += sum(map(row_size, rows))
+
+    def expect_render(self) -> None:
+        """The result will be shown, wait for rendered() before logging"""
+        self._render_pending = True
+
+    def rendered(self, seconds: float) -> None:
+        with self._lock:
+            self.render = seconds
+            self._render_pending = False
+        self._record()
+
+    def finished(self, error: str=None) -> None:
+        """Rows exhausted, cursor closed or statement failed"""
+        with self._lock:
+            if error is not None:
+                self.error = error
+                self._render_pending = False
+            self._done = True
+        self._record()
+
+    def _record(self) -> None:
+        with self._lock:
+            if self._recorded or not self._done or self._render_pending:
+                return
+            self._recorded = True
+        self.log.record(self)
+
+    def as_dict(self) -> dict:
+        def ms(seconds):
+            return None if seconds is None else round(1000 * seconds, 3)
+        return {
+                'time': datetime.datetime.fromtimestamp(self.started).isoformat(),
+                'database': self.database,
+                'sql': self.sql,
+                'prepare_ms': ms(self.prepare),
+                'first_row_ms': ms(self.first_row),
+                'step_ms': ms(self.step),
+                'rows': self.rows,
+                'bytes': self.nbytes,
+                'render_ms': ms(self.render),
+                'cached': self.cached,
+                'error': self.error,
+                }
+
+    def summary(self) -> str:
+        """One line for the status bar"""
+        def ms(seconds):
+            return '-' if seconds is None else f'{1000 * seconds:.1f} ms'
+        if self.error:
+            return f'Error: {self.error}'
+        rows = f'{self.rows}{"" if self._done else "+"} rows'
+        cached = ' (cached)' if self.cached else ''
+        return (f'prepare {ms(self.prepare)}{cached} | first row {ms(self.first_row)} | '
+                f'step {ms(self.step)} | {rows} | {self.nbytes / 1024:.1f} KiB | '
+                f'render {ms(self.render)}')
+
+class MeasuredCursor:
+    def __init__(self, cursor, metrics: StatementMetrics):
+        """Wrap a cursor (sqlite3, CachingCursor or CachedCursor) and time its fetches"""
+        self.cursor = cursor
+        self.metrics = metrics
+        # Called once closed (Query.detach_cursor: close its connection)
+        self.on_close = None
+
+    def fetchmany(self, size: int) -> list:
+        st = time.perf_counter()
+        try:
+            rows = self.cursor.fetchmany(size)
+        except sqlite3.Error as e:
+            self.metrics.finished(str(e))
+            raise
+        self.metrics.fetched(rows, time.perf_counter() - st)
+        if len(rows) < size:
+            self.metrics.finished()
+        return rows
+
+    def fetchall(self) -> list:
+        st = time.perf_counter()
+        rows = self.cursor.fetchall()
+        self.metrics.fetched(rows, time.perf_counter() - st)
+        self.metrics.finished()
+        return rows
+
+    def close(self) -> None:
+        self.metrics.finished()
+        self.cursor.close()
+        if self.on_close is not None:
+            on_close, self.on_close = self.on_close, None
+            on_close()
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+class MetricsLog:
+
+    # Records kept in memory (status bar panel)
+    RECENT = 100
+    # The log is rotated to <log>.1 past this size
+    MAX_BYTES = 10 * 2**20
+
+    def __init__(self, path=None, enabled: bool=True):
+        """
+        path: str | pathlib.Path (default log_path())
+        enabled: bool (append to the JSON-lines log)
+        """
+        self.path = pathlib.Path(path) if path else log_path()
+        self.enabled = enabled
+        self.recent = deque(maxlen=MetricsLog.RECENT)
+        self._lock = threading.Lock()
+
+    def record(self, metrics: StatementMetrics) -> None:
+        with self._lock:
+            self.recent.append(metrics)
+            if not self.enabled:
+                return
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                if self.path.exists() and self.path.stat().st_size > MetricsLog.MAX_BYTES:
+                    os.replace(self.path, f'{self.path}.1')
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(metrics.as_dict()) + '\n')
+            except OSError:
+                # Metrics never break a query
+                pass
+
+# Shared by every Query
+metrics_log = MetricsLog()
+
+if __name__ == "__main__":
+    print('LOCAL (TEST)')
+    metrics = StatementMetrics('SELECT 1', log=MetricsLog(enabled=False))
+    metrics.fetched([(1,)], 0.001)
+    metrics.finished()
+    print(metrics.as_dict())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+
+# This Python file uses the following encoding: utf-8
+
+# Named PRAGMA profiles applied to every connection when it is opened
+# (see db_manager.Database.connect)
+
+import sqlite3
+
+PROFILES = {
+        # SQLite defaults, nothing is changed
+        'default': {},
+        # Large read-mostly databases (browser History files). No
+        # journal_mode here: it would convert the user's file for good
+        'analytics': {
+            'mmap_size': 268435456,     # 256 MiB of memory-mapped I/O
+            'cache_size': -65536,       # 64 MiB page cache (negative -> KiB)
+            'temp_store': 'MEMORY',     # sorts/temp b-trees in memory
+            'query_only': 'ON',
+            },
+        }
+
+# journal_mode is a property of the file, only the writer sets it
+WRITER_ONLY = {'journal_mode'}
+# Readers never write, the writer has to
+READER_ONLY = {'query_only'}
+# Order matters: journal_mode must be set before query_only
+PRAGMAS = ('mmap_size', 'cache_size', 'temp_store', 'journal_mode', 'query_only')
+
+def get_profile(profile) -> dict:
+    """
+    profile: str | dict
+
+    Return the PRAGMA settings of a profile name (see PROFILES) or
+    validate a custom {pragma: value} dict.
+    """
+    if isinstance(profile, str):
+        try:
+            return PROFILES[profile]
+        except KeyError:
+            raise ValueError(f'Unknown connection profile: {profile}') from None
+    unknown = set(profile) - set(PRAGMAS)
+    if unknown:
+        raise ValueError(f'Unsupported pragma(s): {", ".join(sorted(unknown))}')
+    return profile
+
+def profile_key(profile) -> object:
+    """Hashable form of a profile: its name, or the sorted items of a dict"""
+    if isinstance(profile, str):
+        return profile
+    return tuple(sorted(get_profile(profile).items()))
+
+def apply_profile(con: sqlite3.Connection, profile, reader: bool=True,
+                  read_only: bool=False) -> None:
+    """
+    con: sqlite3.Connection
+    profile: str | dict
+    reader: bool (read connection of the pool or the writer)
+    read_only: bool (the file itself is read-only, e.g. a snapshot)
+    """
+    settings = get_profile(profile)
+    for pragma in PRAGMAS:
+        if pragma not in settings:
+            continue
+        if reader and pragma in WRITER_ONLY:
+            continue
+        if not reader and pragma in READER_ONLY:
+            continue
+        if read_only and pragma in WRITER_ONLY:
+            continue
+        value = settings[pragma]
+        if not isinstance(value, int) and not str(value).isidentifier():
+            raise ValueError(f'Invalid value for {pragma}: {value!r}')
+        con.execute(f'PRAGMA {pragma}={value}').fetchall()
+
+if __name__ == "__main__":
+    print('LOCAL (TEST)')
+    con = sqlite3.connect(':memory:')
+    apply_profile(con, 'analytics')
+    for pragma in PRAGMAS:
+        print(pragma, con.execute(f'PRAGMA {pragma}').fetchone())
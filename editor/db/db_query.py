@@ -4,113 +4,233 @@
 
 import datetime
 import pathlib
-import re
 import sys
 import sqlite3
+import threading
+import time
 
+from .db_cache import CachedCursor, CachingCursor, normalize_sql
 from .db_connection import DBConnection
+from .db_metrics import MeasuredCursor, StatementMetrics
+from .sql_lexer import split_statements, statement_keyword
 
 script_path = pathlib.Path(__file__).parent.absolute()
 
 class Query(DBConnection):
-    def __init__(self):
-        super().__init__()
 
-    def query_exe(self, query=None):
+    # Seconds before a running statement is interrupted (None -> no limit)
+    TIMEOUT = None
+    # SQLite virtual machine instructions between progress handler calls
+    PROGRESS_STEPS = 1000
+    # Statements executed on the reader connection of the calling thread
+    READ_KEYWORDS = {'select', 'with', 'values', 'explain'}
+    # Serve repeated read statements from database.cache (db_cache.py)
+    CACHE = True
+
+    # Debug Query (parse_query/query_exe without a query)
+    DEBUG_QUERY = (
+            'SELECT * '
+            'FROM urls '
+            'WHERE url '
+            'LIKE "%music.youtube%" '
+            'ORDER BY last_visit_time desc '
+            'LIMIT 1;'
+            'SELECT * '
+            'FROM urls '
+            'WHERE url '
+            'LIKE "%spotify%" '
+            'ORDER BY last_visit_time desc '
+            'LIMIT 1;'
+            )
+
+    def __init__(self, db: str=None, timeout: float=None, snapshot: bool=False,
+                 profile: str=None):
+        super().__init__(db, snapshot, profile)
+        self.timeout = timeout if timeout is not None else Query.TIMEOUT
+        self._cancelled = threading.Event()
+        self._timed_out = False
+        # Statement deadline of each thread: statements run on the query
+        # thread, result pages are fetched on another (FetchWorker)
+        self._local = threading.local()
+        self._active = None
+
+    def _progress_handler(self) -> int:
+        # Any non-zero return value aborts the statement with
+        # sqlite3.OperationalError('interrupted')
+        if self._cancelled.is_set():
+            return 1
+        deadline = getattr(self._local, 'deadline', None)
+        if deadline is not None and time.monotonic() > deadline:
+            self._timed_out = True
+            return 1
+        return 0
+
+    def cancel(self, interrupt: bool=True) -> None:
+        """Abort the running statement (callable from any thread)
+
+        interrupt=False leaves it to the progress handler, which aborts the
+        statement being stepped only: Connection.interrupt() also aborts
+        the other cursors open on the connection (result grids).
+        """
+        self._cancelled.set()
+        if interrupt and self._active is not None:
+            self._active.interrupt()
+
+    def close_connection(self):
+        self._active = None
+        super().close_connection()
+
+    def reset_cancel(self) -> None:
+        self._cancelled.clear()
+        self._timed_out = False
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def set_deadline(self, timeout: float=None) -> None:
+        """Start the timeout (default self.timeout) of the calling thread's statement"""
+        timeout = timeout if timeout is not None else self.timeout
+        self._local.deadline = time.monotonic() + timeout if timeout else None
+
+    def clear_deadline(self) -> None:
+        self._local.deadline = None
+
+    def error_message(self, error: sqlite3.Error) -> str:
+        if self._cancelled.is_set():
+            return 'Query Cancelled'
+        if self._timed_out:
+            return f'Query Timed Out After {self.timeout}s'
+        return f'{str(error).title()}'
+
+    def parse_query(self, query=None, tokens=None) -> list:
+        """Split the editor text into a list of Statement(sql, start, end, line)
+
+        See sql_lexer.split_statements, start/end are offsets into query,
+        tokens are the already lexed tokens of query (optional).
+        """
 
         # Debug Query
         if query is None:
-            query = (
-                    'SELECT * '
-                    'FROM urls '
-                    'WHERE url '
-                    'LIKE "%music.youtube%" '
-                    'ORDER BY last_visit_time desc '
-                    'LIMIT 1;'
-                    'SELECT * '
-                    'FROM urls '
-                    'WHERE url '
-                    'LIKE "%spotify%" '
-                    'ORDER BY last_visit_time desc '
-                    'LIMIT 1;'
-                    )
-
-        query = query.translate(str.maketrans({'\n':'~','\t':' '}))
-        query = [q.strip() for q in re.split(r'~|;', query) if q.strip() != '']
-        # query = list(filter(None, re.split(r'-|;', query.strip())))
+            query = Query.DEBUG_QUERY
+
+        return split_statements(query, tokens)
+
+    def execute_statement(self, statement: str, timeout: float=None,
+                          writer: bool=False) -> tuple:
+        """Execute a single statement, return (headers, cursor)
+
+        Safe to call from a worker thread, read statements run on the
+        reader connection of the calling thread, anything else on the
+        writer behind database.write_lock. While the script has a
+        transaction open (BEGIN) reads run on the writer too, the readers
+        do not see its uncommitted changes. Every call uses its own cursor.
+        Read statements seen before on an unchanged database are answered
+        from database.cache.
+
+        writer -> run a read statement on the writer too, uncached (see
+        script_writes)
+
+        timeout -> seconds (default self.timeout), the deadline also covers
+        the fetch until clear_deadline() is called
+
+        The cursor is a db_metrics.MeasuredCursor, cursor.metrics holds the
+        StatementMetrics of the statement.
+        """
+        metrics = StatementMetrics(statement, self.db)
+        self.set_deadline(timeout)
+        key = ''
+        if statement_keyword(statement) in Query.READ_KEYWORDS \
+                and not writer and not self.con.in_transaction:
+            con = self.database.reader()
+            lock = None
+            if Query.CACHE:
+                key = normalize_sql(statement)
+        else:
+            con = self.con
+            lock = self.database.write_lock
+        con.set_progress_handler(self._progress_handler, Query.PROGRESS_STEPS)
+        self._active = con
+
+        if key:
+            version = self.database.version()
+            cached = self.database.cache.get(key, version)
+            if cached is not None:
+                headers, rows = cached
+                metrics.cached = True
+                metrics.prepare = 0.0
+                return headers, MeasuredCursor(CachedCursor(headers, rows), metrics)
+
+        cursor = con.cursor()
+        st = time.perf_counter()
+        try:
+            if lock is None:
+                out = cursor.execute(statement)
+            else:
+                with lock:
+                    try:
+                        out = cursor.execute(statement)
+                    finally:
+                        self.database.writes += 1
+        except sqlite3.Error as e:
+            metrics.finished(self.error_message(e))
+            raise
+        metrics.prepare = time.perf_counter() - st
+        metrics.step = metrics.prepare
+        # No description: the statement returns no rows (CREATE, INSERT...)
+        headers = [column[0] for column in out.description or ()]
+        if key:
+            out = CachingCursor(out, self.database.cache, key, version, headers)
+        return headers, MeasuredCursor(out, metrics)
+
+    def script_writes(self, statements: list) -> bool:
+        """
+        statements: list of Statement (parse_query)
+
+        True when a statement of the script is not a read. Its reads then
+        run on the writer: a result left open on a reader holds a shared
+        lock, the writes of the script could not commit while the grid is
+        open (rollback journal, "database is locked").
+        """
+        return any(statement_keyword(statement.sql) not in Query.READ_KEYWORDS
+                   for statement in statements)
+
+    def detach_cursor(self, cursor) -> bool:
+        """
+        cursor: MeasuredCursor (from execute_statement, in the same thread)
+
+        Give a result set left open its own connection: its read
+        connection is detached from the pool (Database.detach_reader) and
+        closed with the cursor, later statements of the thread neither wait
+        on it nor share its read transaction. Return False when the cursor
+        shares its connection with later statements (writer, shared
+        reader), a cached result has no connection and needs nothing.
+        """
+        con = getattr(cursor, 'connection', None)
+        if con is None:
+            return True
+        if con is self.con or not self.database.detach_reader(con):
+            return False
+        if self._active is con:
+            # Closed with the cursor, cancel() must not interrupt it
+            self._active = None
+        database = self.database
+        cursor.on_close = lambda: database.close_detached(con)
+        return True
+
+    def query_exe(self, query=None, timeout: float=None):
+        query = self.parse_query(query)
         query_list = []
-        multiline = False
-        o = False
         if query:
-            o = query[0].strip()
-            if '--' in o:
-                # Single Line Comment
-                index = re.search(r'--',o).end()
-                o = query[0][:index-2]
-            elif '/*' in o:
-                # Multi Line Comment
-                index = re.search(r'/\*',o).start()
-                # print(f'First o {o=}')
-                if '*/' in o:
-                    x = query[0][:index]
-                    index = re.search(r'\*/',o).end()
-                    x += query[0][index:]
-                    # print(f'Second o {o=}')
-                    multiline = False
-                    o = x
-                else:
-                    o = query[0][:index]
-                    multiline = True
-            for q in query[1:]:
-                if multiline:
-                    index = re.search(r'\*/',q)
-                    if index:
-                        index = index.end()
-                        #print(f'{q[index:]=}')
-                        o += q[index:]
-                        multiline = False
-                    else:
-                        continue
-                elif '--' in q:
-                    # Single Line Comment
-                    index = re.search(r'--',q).end()
-                    q = q[:index-2].lower().strip()
-                    if q.startswith('select'):
-                        o += f';{q}'
-                    else:
-                        o += q[:index-2].strip()
-                    #print(f'SINGLE {o=}')
-                elif '/*' in q:
-                    # Multi Line Comment
-                    index = re.search(r'/\*',q).start()
-                    if '*/' in q:
-                        x = q[:index]
-                        index = re.search(r'\*/',q).end()
-                        x += q[index:]
-                        multiline = False
-                        o += x
-                    else:
-                        o += q[:index]
-                        multiline = True
-                else:
-                    if q.lower().strip().startswith('select'):
-                        o += f';{q}'
-                        continue
-                    o += f' {q}'
-            query = [q for q in o.split(';') if q != '']
-            # print(query)
-            if query:
-                print('[Query]',*query, sep='\n', end='\n\n')
-            for i,q in enumerate(query,1):
-                self.cursor = self.con.cursor()
-                # print(Thread(target=self.cursor.execute(q), daemon=True, name='QUERY'))
+            self.reset_cancel()
+            writes = self.script_writes(query)
+            for q in query:
                 try:
-                    i = self.cursor.execute(q)
-                    headers = [column[0] for column in i.description]
-                    t = headers, i
+                    t = self.execute_statement(q.sql, timeout, writes)
                 except sqlite3.OperationalError as e:
-                    print(f'{str(e).title()}')
+                    print(f'Line {q.line}: {self.error_message(e)}')
                     return
+                finally:
+                    self.clear_deadline()
                 query_list.append(t)
             return query_list
         return False
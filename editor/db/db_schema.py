@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+
+# This Python file uses the following encoding: utf-8
+
+# Tables, views, columns and indexes of a database, read with one query
+# and cached on disk until the schema changes (PRAGMA schema_version)
+
+import hashlib
+import json
+import os
+import pathlib
+import re
+import sqlite3
+
+# pragma_table_list needs SQLite 3.37
+CATALOG_QUERY = (
+        'SELECT t.type, t.name, c.name, c.cid '
+        'FROM pragma_table_list AS t, pragma_table_info(t.name, t.schema) AS c '
+        "WHERE t.schema = 'main' AND t.type IN ('table', 'view', 'virtual') "
+        "AND t.name NOT LIKE 'sqlite_%' "
+        'UNION ALL '
+        "SELECT 'index', name, tbl_name, 0 FROM sqlite_master WHERE type = 'index' "
+        'ORDER BY 1, 2, 4;'
+        )
+# Older SQLite, the table-valued pragma_table_info is 3.16+
+FALLBACK_QUERY = (
+        'SELECT s.type, s.name, c.name, c.cid '
+        'FROM sqlite_master AS s, pragma_table_info(s.name) AS c '
+        "WHERE s.type IN ('table', 'view') AND s.name NOT LIKE 'sqlite_%' "
+        'UNION ALL '
+        "SELECT 'index', name, tbl_name, 0 FROM sqlite_master WHERE type = 'index' "
+        'ORDER BY 1, 2, 4;'
+        )
+
+_WORD = re.compile(r'\w+')
+
+def cache_dir() -> pathlib.Path:
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return pathlib.Path(base, 'dmnix-sqldb', 'schema')
+
+class SchemaCatalog:
+    def __init__(self, schema_version: int=0, tables: dict=None,
+                 views: dict=None, indexes: dict=None):
+        """
+        schema_version: int (PRAGMA schema_version the catalog was read at)
+        tables: dict (table -> columns, in table order)
+        views: dict (view -> columns)
+        indexes: dict (index -> table)
+        """
+        self.schema_version = schema_version
+        self.tables = tables or {}
+        self.views = views or {}
+        self.indexes = indexes or {}
+        # Names are looked up case-insensitively, as SQLite does
+        self._columns = {name.lower(): columns
+                         for name, columns in (*self.tables.items(), *self.views.items())}
+        self._matcher = None
+
+    @classmethod
+    def read(cls, con: sqlite3.Connection) -> 'SchemaCatalog':
+        """Introspect the whole schema with a single query"""
+        schema_version = con.execute('PRAGMA schema_version').fetchone()[0]
+        try:
+            rows = con.execute(CATALOG_QUERY).fetchall()
+        except sqlite3.OperationalError:
+            rows = con.execute(FALLBACK_QUERY).fetchall()
+
+        tables, views, indexes = {}, {}, {}
+        for kind, name, value, _ in rows:
+            if kind == 'index':
+                indexes[name] = value
+            elif kind == 'view':
+                views.setdefault(name, []).append(value)
+            else:
+                tables.setdefault(name, []).append(value)
+        return cls(schema_version, tables, views, indexes)
+
+    @classmethod
+    def load(cls, con: sqlite3.Connection, path: str) -> 'SchemaCatalog':
+        """
+        con: sqlite3.Connection
+        path: str (database file, names the cache file)
+
+        Return the catalog cached for path when it was read at the current
+        schema_version, otherwise read it and cache it.
+        """
+        if path == ':memory:':
+            return cls.read(con)
+        schema_version = con.execute('PRAGMA schema_version').fetchone()[0]
+        cache = cache_dir() / f'{hashlib.sha1(path.encode()).hexdigest()}.json'
+        try:
+            with open(cache, encoding='utf-8') as f:
+                data = json.load(f)
+            if data['path'] == path and data['schema_version'] == schema_version:
+                return cls(schema_version, data['tables'], data['views'], data['indexes'])
+        except (OSError, ValueError, KeyError):
+            pass
+
+        catalog = cls.read(con)
+        catalog.save(cache, path)
+        return catalog
+
+    def save(self, cache: pathlib.Path, path: str) -> None:
+        data = {
+                'path': path,
+                'schema_version': self.schema_version,
+                'tables': self.tables,
+                'views': self.views,
+                'indexes': self.indexes,
+                }
+        try:
+            cache.parent.mkdir(parents=True, exist_ok=True)
+            temp = cache.with_suffix(f'.{os.getpid()}.tmp')
+            with open(temp, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(temp, cache)
+        except OSError:
+            # The cache is only an optimization
+            pass
+
+    def names(self) -> list:
+        """Tables and views, sorted"""
+        return sorted([*self.tables, *self.views])
+
+    def columns(self, name: str) -> list:
+        """Columns of a table or a view ([] when unknown)"""
+        return self._columns.get(name.lower(), [])
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self._columns
+
+    def matcher(self) -> 'TableMatcher':
+        """TableMatcher of the tables and views, built once"""
+        if self._matcher is None:
+            self._matcher = TableMatcher(self.names())
+        return self._matcher
+
+class TableMatcher:
+    def __init__(self, names: list):
+        """
+        names: list (tables and views)
+
+        Find which of the names appear in a text as whole words, in one
+        pass over the text whatever the number of names: the text is split
+        into words by a single compiled regex and every distinct word is
+        looked up in a dict. Names that are not plain words ("my table")
+        are matched by one alternation, bounded by non-word characters.
+        Names are matched case-insensitively, as SQLite resolves them.
+        """
+        self._words = {}
+        others = {}
+        for name in names:
+            if _WORD.fullmatch(name):
+                self._words[name.lower()] = name
+            else:
+                others[name.lower()] = name
+        self._others = others
+        self._pattern = None
+        if others:
+            alternation = '|'.join(map(re.escape, sorted(others, key=len, reverse=True)))
+            self._pattern = re.compile(fr'(?<!\w)(?:{alternation})(?!\w)', re.IGNORECASE)
+
+    def find(self, text: str) -> set:
+        """Names found in text, spelled as in the schema"""
+        words = self._words
+        found = {words[word] for word in {word.lower() for word in set(_WORD.findall(text))}
+                 if word in words}
+        if self._pattern is not None:
+            found.update(self._others[match.lower()]
+                         for match in self._pattern.findall(text))
+        return found
+
+if __name__ == "__main__":
+    print('LOCAL (TEST)')
+    con = sqlite3.connect(':memory:')
+    con.executescript(
+            'CREATE TABLE urls (id INTEGER PRIMARY KEY, url TEXT);'
+            'CREATE INDEX urls_url ON urls (url);'
+            'CREATE VIEW recent AS SELECT url FROM urls;')
+    catalog = SchemaCatalog.read(con)
+    print(catalog.tables, catalog.views, catalog.indexes)
+    print(catalog.matcher().find('SELECT * FROM URLS JOIN recent_urls, recent'))
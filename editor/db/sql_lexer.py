@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+
+# This Python file uses the following encoding: utf-8
+
+# Single pass SQL lexer, used to split scripts into statements.
+#
+# Every token is found by one compiled alternation, so a script is scanned
+# once from left to right no matter how many statements, comments or
+# string literals it contains. A ';' ends a statement, except in the body
+# of a CREATE TRIGGER, which ends with '; END;' (the rule of
+# sqlite3_complete, followed token by token instead of calling
+# sqlite3.complete_statement on the statement so far at every ';').
+
+from collections import namedtuple
+
+import re
+
+# Lexer states, the state a text ends in is the state the next one
+# (e.g. the next line) starts in
+STATE_NORMAL = 0
+STATE_STRING = 1    # '...'
+STATE_QUOTED = 2    # "..."
+STATE_COMMENT = 3   # /* ... */
+STATE_BACKTICK = 4  # `...`
+STATE_BRACKET = 5   # [...]
+
+Token = namedtuple('Token', 'kind start end')
+Statement = namedtuple('Statement', 'sql start end line')
+
+_NORMAL = re.compile(r"""
+      (?P<whitespace>\s+)
+    | (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<comment_open>/\*.*\Z)
+    | (?P<string>'[^']*(?:''[^']*)*')
+    | (?P<string_open>'[^']*(?:''[^']*)*\Z)
+    | (?P<identifier>"[^"]*(?:""[^"]*)*"|`[^`]*(?:``[^`]*)*`|\[[^\]]*\])
+    | (?P<quoted_open>"[^"]*(?:""[^"]*)*\Z)
+    | (?P<backtick_open>`[^`]*(?:``[^`]*)*\Z)
+    | (?P<bracket_open>\[[^\]]*\Z)
+    | (?P<number>0[xX][0-9a-fA-F]+|(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)
+    | (?P<word>\w+)
+    | (?P<semicolon>;)
+    | (?P<operator>.)
+    """, re.VERBOSE | re.DOTALL)
+
+# Open (unterminated) groups -> token kind, state at the end of the text
+_OPEN = {
+        'comment_open': ('comment', STATE_COMMENT),
+        'string_open': ('string', STATE_STRING),
+        'quoted_open': ('identifier', STATE_QUOTED),
+        'backtick_open': ('identifier', STATE_BACKTICK),
+        'bracket_open': ('identifier', STATE_BRACKET),
+        }
+
+# Text starting inside a multi-line token: (closing pattern, token kind)
+_CONTINUE = {
+        STATE_COMMENT: (re.compile(r'.*?\*/', re.DOTALL), 'comment'),
+        STATE_STRING: (re.compile(r"[^']*(?:''[^']*)*'"), 'string'),
+        STATE_QUOTED: (re.compile(r'[^"]*(?:""[^"]*)*"'), 'identifier'),
+        STATE_BACKTICK: (re.compile(r'[^`]*(?:``[^`]*)*`'), 'identifier'),
+        STATE_BRACKET: (re.compile(r'[^\]]*\]'), 'identifier'),
+        }
+
+def iter_tokens(text: str, state: int=STATE_NORMAL, pos: int=0):
+    """
+    text: str
+    state: int (lexer state the text starts in)
+    pos: int (offset to start at)
+
+    Yield Token(kind, start, end) for text[pos:], the last token of a
+    text ending inside a comment/string is yielded with its open kind
+    (see tokenize).
+    """
+    if state != STATE_NORMAL:
+        pattern, kind = _CONTINUE[state]
+        match = pattern.match(text, pos)
+        if match is None:
+            yield Token(f'{kind}_open', pos, len(text))
+            return
+        if match.end() > pos:
+            yield Token(kind, pos, match.end())
+        pos = match.end()
+
+    for match in _NORMAL.finditer(text, pos):
+        yield Token(match.lastgroup, match.start(), match.end())
+
+def tokenize(text: str, state: int=STATE_NORMAL) -> tuple:
+    """Return (tokens, end_state), open tokens are reported by their kind"""
+    tokens = []
+    end_state = STATE_NORMAL
+    for token in iter_tokens(text, state):
+        if token.kind.endswith('_open'):
+            end_state = _open_state(token.kind, state)
+            token = Token(_open_kind(token.kind, state), token.start, token.end)
+        tokens.append(token)
+    return tokens, end_state
+
+def _open_state(kind: str, state: int) -> int:
+    if kind in _OPEN:
+        return _OPEN[kind][1]
+    # Continuation of a multi-line token that is still open
+    return state
+
+def _open_kind(kind: str, state: int) -> str:
+    if kind in _OPEN:
+        return _OPEN[kind][0]
+    return kind[:-len('_open')]
+
+# Statements a WITH clause can be followed by
+_CTE_BODY = {'select', 'values', 'insert', 'replace', 'update', 'delete'}
+
+def statement_keyword(sql: str) -> str:
+    """
+    First keyword of a statement, lower case ('' if there is none). For
+    a WITH clause the first keyword after its common table expressions:
+    'WITH x AS (SELECT 1) DELETE ...' -> 'delete', 'with' if there is none
+    """
+    keyword = ''
+    depth = 0
+    for kind, start, end in iter_tokens(sql):
+        if kind in ('whitespace', 'comment', 'comment_open'):
+            continue
+        if not keyword:
+            if kind != 'word':
+                return ''
+            keyword = sql[start:end].lower()
+            if keyword != 'with':
+                return keyword
+        elif kind == 'operator':
+            if sql[start] == '(':
+                depth += 1
+            elif sql[start] == ')':
+                depth = max(0, depth - 1)
+        elif kind == 'word' and depth == 0 and sql[start:end].lower() in _CTE_BODY:
+            return sql[start:end].lower()
+    return keyword
+
+def statement_at(statements: list, position: int):
+    """
+    statements: list (Statement, from split_statements)
+    position: int (offset into the script)
+
+    Statement under (or after) position, the last one past the end, None
+    if there is none
+    """
+    for statement in statements:
+        if position <= statement.end:
+            return statement
+    return statements[-1] if statements else None
+
+# A line starting with SELECT begins a new statement, even without a ';',
+# unless it continues a compound select
+_COMPOUND = {'union', 'all', 'except', 'intersect'}
+# First words of a statement whose ';' do not end it before '; END;'
+_TRIGGER = {prefix + head
+            for prefix in ((), ('explain',))
+            for head in (('create', 'trigger'), ('create', 'temp', 'trigger'),
+                         ('create', 'temporary', 'trigger'))}
+
+def split_statements(text: str, tokens=None) -> list:
+    """
+    text: str
+    tokens: iterable (Token of text, e.g. from the highlighter; default
+            lex text here)
+
+    Split a script into a list of Statement(sql, start, end, line) in one
+    pass. Comments are dropped from sql, start/end are offsets into text
+    and line is the 1-based line the statement starts on.
+    """
+    statements = []
+    parts = []          # sql fragments of the current statement
+    start = None        # offset of the first token of the current statement
+    first_word = None
+    last_word = None
+    depth = 0
+    head = ()           # first words, up to the TRIGGER of a CREATE TRIGGER
+    trigger = False
+    previous = ('', '') # last two tokens, ';' and 'end' end a trigger
+    newline = True      # only whitespace since the last line break
+    line = 1
+    counted = 0         # newlines are counted up to this offset
+
+    def close(end):
+        nonlocal parts, start, first_word, last_word, depth, line, counted, \
+                head, trigger, previous
+        sql = ''.join(parts).strip()
+        if sql:
+            line += text.count('\n', counted, start)
+            counted = start
+            statements.append(Statement(sql, start, end, line))
+        parts = []
+        start = first_word = last_word = None
+        depth = 0
+        head = ()
+        trigger = False
+        previous = ('', '')
+
+    if tokens is None:
+        tokens = iter_tokens(text)
+    for kind, token_start, token_end in tokens:
+        if kind == 'whitespace':
+            if parts:
+                parts.append(text[token_start:token_end])
+            if '\n' in text[token_start:token_end]:
+                newline = True
+            continue
+        if kind in ('comment', 'comment_open'):
+            if parts:
+                parts.append(' ')
+            continue
+
+        value = text[token_start:token_end]
+        if kind == 'word':
+            word = value.lower()
+            if (word == 'select' and newline and depth == 0
+                    and first_word == 'select' and last_word not in _COMPOUND):
+                close(token_start)
+            if first_word is None and start is None:
+                first_word = word
+            last_word = word
+            if len(head) < 4 and not trigger:
+                head += (word,)
+                trigger = head in _TRIGGER
+        elif kind == 'operator':
+            if value == '(':
+                depth += 1
+                last_word = '('
+            elif value == ')':
+                depth = max(0, depth - 1)
+        newline = False
+
+        if kind == 'semicolon':
+            if start is not None and (not trigger or previous == (';', 'end')):
+                close(token_end)
+                continue
+            if start is None:
+                continue
+        elif len(head) < 4 and kind != 'word':
+            # Words after a '(' or a name are not the first words
+            head += ('',)
+        previous = (previous[1], 'end' if kind == 'word' and word == 'end'
+                    else value if kind == 'semicolon' else '')
+
+        if start is None:
+            start = token_start
+        parts.append(value)
+
+    if start is not None:
+        close(len(text))
+    return statements
+
+if __name__ == "__main__":
+    print('LOCAL (TEST)')
+    script = (
+            "SELECT ';' AS semi -- comment; not a boundary\n"
+            "FROM urls; /* block; comment */ SELECT 2\n"
+            "SELECT 3;\n"
+            )
+    for statement in split_statements(script):
+        print(statement)
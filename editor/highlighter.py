@@ -1,83 +1,178 @@
 #!/usr/bin/env python
 
-from PySide6.QtCore import (
-        QRegularExpression
-        )
 from PySide6.QtGui import (
         QColor,
+        QTextBlock,
+        QTextBlockUserData,
         QTextCharFormat,
+        QTextLayout,
         QSyntaxHighlighter
         )
 
 import re
 
+try:
+    from .db.sql_lexer import STATE_NORMAL, tokenize
+except ImportError:
+    # sqlcode_editor.py executed as a script
+    from db.sql_lexer import STATE_NORMAL, tokenize
+
+def utf16_length(text: str) -> int:
+    """Length of text in UTF-16 code units, the unit of Qt text positions"""
+    if text.isascii():
+        return len(text)
+    return len(text.encode('utf-16-le')) // 2
+
+def to_utf16(text: str, index: int) -> int:
+    """Qt position (UTF-16 units) of text[index:], past an emoji they differ"""
+    return utf16_length(text[:index])
+
+def to_code_point(text: str, position: int) -> int:
+    """Index into text of a Qt position (UTF-16 units)"""
+    if text.isascii():
+        return position
+    return len(text.encode('utf-16-le')[:2 * position].decode('utf-16-le', 'ignore'))
+
+class BlockData(QTextBlockUserData):
+    def __init__(self, tokens: list, state_in: int, text: str=None):
+        """
+        tokens: list (sql_lexer.Token, offsets relative to the block)
+        state_in: int (lexer state the block was lexed from)
+        text: str (block text, kept by Highlighter.format_block only)
+        """
+        QTextBlockUserData.__init__(self)
+        self.tokens = tokens
+        self.state_in = state_in
+        self.text = text
+
 class Highlighter(QSyntaxHighlighter):
     def __init__(self, parent=None):
+        """
+        Every block is lexed with db/sql_lexer.py starting from the state
+        the previous block ended in (the block state). QSyntaxHighlighter
+        only moves on to the next block while that state keeps changing,
+        so an edit costs the edited block plus the blocks whose state it
+        changed. The tokens are kept in the block user data.
+        """
         QSyntaxHighlighter.__init__(self, parent)
+        # word -> format (keywords, table names)
+        self._words = {}
+        self._groups = {}
+        # token kind -> format
+        self._kinds = {}
+        # Extra regex patterns, applied after the tokens
         self._mappings = {}
 
         quotes_color = QColor("#FF0000")
         quotes_format  = QTextCharFormat()
         quotes_format.setForeground(quotes_color)
-        self.single = (QRegularExpression("\'"),None,1,quotes_format)
-        #self.double = (QRegularExpression("\""),None,2,quotes_format)
+        self._kinds['string'] = quotes_format
 
-        #startExpression = QRegularExpression("(/\\*|'|\")")
         multiLine_color = QColor("#4d491d")
         multiLineCommentFormat = QTextCharFormat()
         multiLineCommentFormat.setForeground(multiLine_color)
-        startExpression = QRegularExpression("/\\*")
-        endExpression = QRegularExpression(f"\\*/")
-        self.comment = (startExpression, endExpression,3,multiLineCommentFormat)
+        self._kinds['comment'] = multiLineCommentFormat
 
     def add_mapping(self, pattern, format):
-        self._mappings[pattern] = format
-
-    def highlightBlock(self, text):
-        pt = True
-        for pattern, format in self._mappings.items():
-            for match in re.finditer(pattern, text, re.MULTILINE):
-                if '--' in match.string:
-                    pt = False
-                start, end = match.span()
-                self.setFormat(start, end - start, format)
-
-        self.setCurrentBlockState(0)
-
-        if pt:
-            quotes_multiline =  self.match_multiline(text, *self.single)
-
-        comment_multiline = self.match_multiline(text, *self.comment)
-
-    def match_multiline(self, text, delimiter, endDelimiter, in_state, style):
-        if not endDelimiter:
-            endDelimiter = delimiter
-
-        if self.previousBlockState() == in_state:
-            start = 0
-            add = 0
-        else:
-            match = delimiter.match(text)
-            start = match.capturedStart()
-            add = match.capturedLength()
-
-        while start >= 0:
-            match = endDelimiter.match(text, start + add)
-            end =  match.capturedStart()
-            if end >= add:
-                length = end - start + match.capturedLength()
-                self.setCurrentBlockState(0)
+        self._mappings[pattern] = (re.compile(pattern, re.MULTILINE), format)
+
+    def set_format(self, kind: str, format):
+        """Format of a token kind ('comment', 'string', 'number', ...)"""
+        self._kinds[kind] = format
+
+    def set_words(self, name: str, words: list, format):
+        """
+        name: str (e.g. 'keyword', 'table')
+        words: list
+        format: QTextCharFormat
+
+        Highlight whole words, looked up per word token. Replacing a group
+        only rehighlights the blocks that contain an old or a new word.
+        """
+        words = set(words)
+        old = self._groups.get(name, (set(), None))[0]
+        self._groups[name] = (words, format)
+        # Later groups win, as they did when every word was a pattern
+        self._words = {}
+        for group_words, group_format in self._groups.values():
+            self._words.update(dict.fromkeys(group_words, group_format))
+
+        changed = words ^ old
+        if not changed or self.document() is None:
+            return
+        block = self.document().firstBlock()
+        while block.isValid():
+            data = block.userData()
+            if data is None:
+                self.rehighlightBlock(block)
+            else:
+                text = block.text()
+                if any(kind == 'word' and text[start:end] in changed
+                       for kind, start, end in data.tokens):
+                    self.rehighlightBlock(block)
+            block = block.next()
+
+    def _formats(self, text: str, state_in: int):
+        """Return the (start, length, format) ranges, the tokens and the end state"""
+        tokens, state = tokenize(text, state_in)
+
+        ranges = []
+        words = self._words
+        kinds = self._kinds
+        for kind, start, end in tokens:
+            if kind == 'word':
+                format = words.get(text[start:end])
             else:
-                self.setCurrentBlockState(in_state)
-                length = len(text) - start + add # - match.capturedLength()
+                format = kinds.get(kind)
+            if format is not None:
+                ranges.append((start, end - start, format))
 
-            self.setFormat(start, length, style)
-            match = delimiter.match(text, start + length)
-            start = match.capturedStart()
+        for regex, format in self._mappings.values():
+            for match in regex.finditer(text):
+                start, end = match.span()
+                ranges.append((start, end - start, format))
+        if utf16_length(text) != len(text):
+            # Formats are set in UTF-16 units
+            ranges = [(to_utf16(text, start), to_utf16(text, start + length)
+                       - to_utf16(text, start), format)
+                      for start, length, format in ranges]
+        return ranges, tokens, state
 
-        # Return True if still inside a multi-line string, False otherwise
-        if self.currentBlockState() == in_state:
-            return True
-        else:
+    def highlightBlock(self, text):
+        state_in = max(self.previousBlockState(), STATE_NORMAL)
+        ranges, tokens, state = self._formats(text, state_in)
+        for start, length, format in ranges:
+            self.setFormat(start, length, format)
+
+        self.setCurrentBlockUserData(BlockData(tokens, state_in))
+        self.setCurrentBlockState(state)
+
+    def format_block(self, block: QTextBlock, force: bool=False) -> bool:
+        """
+        Highlight one block of a document the highlighter is not attached
+        to (large files, see TextEdit.setLargeFileMode): only the blocks
+        that get painted are lexed, starting from the state the previous
+        block ended in when it is known. Return False when the block is
+        already highlighted (force: the formats changed).
+        """
+        text = block.text()
+        previous = block.previous()
+        state_in = max(previous.userState(), STATE_NORMAL) if previous.isValid() \
+                else STATE_NORMAL
+        data = block.userData()
+        if not force and isinstance(data, BlockData) and data.text == text \
+                and data.state_in == state_in:
             return False
-
+        ranges, tokens, state = self._formats(text, state_in)
+
+        formats = []
+        for start, length, format in ranges:
+            range_ = QTextLayout.FormatRange()
+            range_.start = start
+            range_.length = length
+            range_.format = format
+            formats.append(range_)
+        block.layout().setFormats(formats)
+        block.setUserData(BlockData(tokens, state_in, text))
+        block.setUserState(state)
+        return True
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+# This Python file uses the following encoding: utf-8
+
+from PySide6.QtCore import (
+        QObject,
+        QTimer,
+        Signal,
+        Slot)
+from PySide6.QtGui import (
+        QTextCursor,
+        QTextDocument)
+
+import codecs
+import mmap
+import os
+
+def iter_chunks(path: str, chunk_size: int, encoding: str='utf-8'):
+    """
+    Yield the decoded text of a file, chunk_size bytes at a time, read
+    through a memory map. Multi-byte characters split between two chunks
+    are decoded once the next chunk arrives, line breaks are normalized
+    to '\\n' (a '\\r' at the end of a chunk waits for the next one).
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    size = os.path.getsize(path)
+    if not size:
+        return
+    pending = ''
+    with open(path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        for offset in range(0, size, chunk_size):
+            end = min(offset + chunk_size, size)
+            text = pending + decoder.decode(data[offset:end], end == size)
+            pending = ''
+            if text.endswith('\r') and end < size:
+                text, pending = text[:-1], '\r'
+            yield text.replace('\r\n', '\n').replace('\r', '\n'), end
+
+class LargeFileLoader(QObject):
+    progress = Signal(int, int)
+    finished = Signal()
+
+    # Bytes appended to the document per event loop pass
+    CHUNK_SIZE = 2**20
+
+    def __init__(self, path: str, document: QTextDocument, parent=None):
+        """
+        path: str
+        document: QTextDocument (cleared and filled with the file)
+
+        Append a file to a document one chunk per event loop pass instead
+        of building the whole text with QTextStream.readAll(), the window
+        keeps repainting and the first lines can be read while the rest is
+        loading. Undo is off while loading, one undo step per chunk is of
+        no use.
+
+        progress -> (bytes loaded, file size)
+        """
+        super().__init__(parent)
+        self.path = path
+        self.document = document
+        self.size = os.path.getsize(path)
+        self._chunks = None
+        self._timer = QTimer(self)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self.loadChunk)
+
+    def start(self) -> None:
+        self.document.clear()
+        self.document.setUndoRedoEnabled(False)
+        self._chunks = iter_chunks(self.path, LargeFileLoader.CHUNK_SIZE)
+        self._timer.start()
+
+    def isLoading(self) -> bool:
+        return self._timer.isActive()
+
+    def stop(self) -> None:
+        """Keep what has been loaded so far"""
+        if self._chunks is not None:
+            self._timer.stop()
+            self._chunks.close()
+            self._chunks = None
+            self.document.setUndoRedoEnabled(True)
+
+    @Slot()
+    def loadChunk(self) -> None:
+        try:
+            text, loaded = next(self._chunks)
+        except StopIteration:
+            self.stop()
+            self.finished.emit()
+            return
+        cursor = QTextCursor(self.document)
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+        self.progress.emit(loaded, self.size)
+
+if __name__ == "__main__":
+    print('Local [TEST]')
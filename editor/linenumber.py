@@ -9,7 +9,7 @@ class LineNumberArea(QWidget):
         self._code_editor = editor
 
     def sizeHint(self):
-        return QSize(self._code_editor.line_number_area_width(), 0)
+        return QSize(self._code_editor.lineNumberAreaWidth(), 0)
 
     def paintEvent(self, event):
         self._code_editor.lineNumberAreaPaintEvent(event)
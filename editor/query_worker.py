@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+
+# This Python file uses the following encoding: utf-8
+
+from PySide6.QtCore import (
+        QObject,
+        QRunnable,
+        Signal,
+        Slot)
+
+import sqlite3
+
+try:
+    from .db.db_export import export_cursor
+    from .db.sql_lexer import statement_at, statement_keyword
+    from .highlighter import to_code_point
+except ImportError:
+    # sqlcode_editor.py executed as a script
+    from db.db_export import export_cursor
+    from db.sql_lexer import statement_at, statement_keyword
+    from highlighter import to_code_point
+
+class QueryWorkerSignals(QObject):
+    """
+    QRunnable is not a QObject, so the signals live here.
+
+    result -> (headers, cursor, first_rows) of each statement, emitted as
+              soon as the first rows are available
+    error -> (error message, offset of the failing statement in the editor)
+    finished -> emitted once, after the last statement (or the error)
+    progress -> rows written so far (ExportWorker)
+    schema -> PRAGMA schema_version after the statements (QueryWorker)
+    """
+    result = Signal(object)
+    error = Signal(str, int)
+    finished = Signal()
+    progress = Signal(int)
+    schema = Signal(int)
+
+class QueryWorker(QRunnable):
+    def __init__(self, query, text: str, prefetch: int=15):
+        """
+        query: Query (db_query.py)
+        text: str (the script, split into statements by run)
+        prefetch: int (rows fetched before the result is emitted)
+
+        Splits the script and runs every statement in a QThreadPool thread
+        so the GUI thread never lexes a large script or blocks on SQLite.
+        """
+        super().__init__()
+        self.query = query
+        self.text = text
+        self.prefetch = prefetch
+        self.signals = QueryWorkerSignals()
+
+    @Slot()
+    def run(self) -> None:
+        statement = None
+        try:
+            statements = self.query.parse_query(self.text)
+            writes = self.query.script_writes(statements)
+            for statement in statements:
+                if self.query.is_cancelled():
+                    break
+                headers, cursor = self.query.execute_statement(
+                        statement.sql, writer=writes)
+                # Logged once fillTable has rendered the result
+                cursor.metrics.expect_render()
+                # The rest of the rows are fetched page by page while the
+                # grid scrolls (FetchWorker), a read connection is handed
+                # over to the result so the next statement does not share it
+                rows = cursor.fetchmany(self.prefetch)
+                if len(rows) == self.prefetch:
+                    self.query.detach_cursor(cursor)
+                self.query.clear_deadline()
+                self.signals.result.emit((headers, cursor, rows))
+        except sqlite3.Error as e:
+            self.signals.error.emit(
+                    f'Line {statement.line}: {self.query.error_message(e)}',
+                    statement.start)
+        finally:
+            self.query.clear_deadline()
+            try:
+                # The statements may have created, altered or dropped tables
+                self.signals.schema.emit(self.query.database.schema_version())
+            except sqlite3.Error:
+                pass
+            self.signals.finished.emit()
+
+class FetchWorker(QRunnable):
+    def __init__(self, query, cursor, count: int):
+        """
+        query: Query (db_query.py)
+        cursor: result cursor left open by QueryWorker
+        count: int (rows to fetch)
+
+        Fetch the next page of a result grid (CustomTableView.fetchMore)
+        off the GUI thread, under the statement timeout and Cancel of
+        query. Emits result -> rows ([] once the statement failed, the
+        grid then stops fetching), error -> (message, 0).
+        """
+        super().__init__()
+        self.query = query
+        self.cursor = cursor
+        self.count = count
+        self.signals = QueryWorkerSignals()
+
+    @Slot()
+    def run(self) -> None:
+        rows = []
+        try:
+            self.query.set_deadline()
+            rows = self.cursor.fetchmany(self.count)
+        except sqlite3.Error as e:
+            self.signals.error.emit(self.query.error_message(e), 0)
+        finally:
+            self.query.clear_deadline()
+            self.signals.result.emit(rows)
+            self.signals.finished.emit()
+
+class SchemaWorker(QRunnable):
+    def __init__(self, database):
+        """
+        database: db_manager.Database
+
+        Read the schema catalog (Database.schema) off the GUI thread, the
+        window is shown before the schema of a large database is read.
+        Emits result -> (database, SchemaCatalog).
+        """
+        super().__init__()
+        self.database = database
+        self.signals = QueryWorkerSignals()
+
+    @Slot()
+    def run(self) -> None:
+        try:
+            self.signals.result.emit((self.database, self.database.schema()))
+        except sqlite3.Error as e:
+            self.signals.error.emit(str(e), 0)
+        finally:
+            self.signals.finished.emit()
+
+class ExportWorker(QRunnable):
+    def __init__(self, query, text: str, position: int, path: str, fmt: str):
+        """
+        query: Query (db_query.py)
+        text: str (the script)
+        position: int (cursor position in text, Qt UTF-16 units)
+        path: str
+        fmt: str (db_export.FORMATS key)
+
+        Stream the rows of the statement under the cursor from its cursor
+        to a file (db_export.export_cursor), the rows never reach a model.
+        The script is split here, off the GUI thread, and only a read
+        statement is exported. Cancelled with query.cancel(). Emits
+        progress -> rows written after every chunk, result -> (path, rows)
+        once the file is complete.
+        """
+        super().__init__()
+        self.query = query
+        self.text = text
+        self.position = position
+        self.path = path
+        self.fmt = fmt
+        self.signals = QueryWorkerSignals()
+
+    @Slot()
+    def run(self) -> None:
+        statement = statement_at(self.query.parse_query(self.text),
+                                 to_code_point(self.text, self.position))
+        try:
+            if statement is None:
+                return
+            if statement_keyword(statement.sql) not in self.query.READ_KEYWORDS:
+                self.signals.error.emit(
+                        'Only the rows of a SELECT, WITH, VALUES or '
+                        'EXPLAIN statement can be exported.', statement.start)
+                return
+            # No statement timeout, writing millions of rows takes a while
+            headers, cursor = self.query.execute_statement(statement.sql, timeout=0)
+            try:
+                rows = export_cursor(
+                        cursor, headers, self.path, self.fmt,
+                        progress=self.signals.progress.emit,
+                        cancelled=self.query.is_cancelled)
+            finally:
+                cursor.close()
+            if rows is not None:
+                self.signals.result.emit((self.path, rows))
+        except sqlite3.Error as e:
+            self.signals.error.emit(
+                    f'Line {statement.line}: {self.query.error_message(e)}',
+                    statement.start)
+        except (ImportError, OSError, ValueError) as e:
+            self.signals.error.emit(str(e), statement.start)
+        finally:
+            self.query.clear_deadline()
+            self.signals.finished.emit()
+
+if __name__ == "__main__":
+    print('Local [TEST]')
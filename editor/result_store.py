@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+
+# This Python file uses the following encoding: utf-8
+
+# Columnar storage for result sets (CustomTableView, table_view.py)
+#
+# Every column keeps its values in a typed array.array ('q' integers,
+# 'd' reals, 'q' indexes into a per-column pool of interned strings) plus
+# a null bitmap, instead of one boxed Python object per cell. A column
+# that mixes types falls back to a plain list.
+
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+KIND_NULL = 'null'      # only NULLs so far
+KIND_INT = 'int'
+KIND_REAL = 'real'
+KIND_TEXT = 'text'
+KIND_OBJECT = 'object'  # mixed types / blobs
+
+_INT_MIN = -2**63
+_INT_MAX = 2**63 - 1
+
+class Column:
+    def __init__(self):
+        self.kind = KIND_NULL
+        self.values = array('q')
+        self.nulls = bytearray()
+        self.pool = []          # interned strings (KIND_TEXT)
+        self.pool_index = {}
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def is_null(self, row: int) -> bool:
+        return bool(self.nulls[row >> 3] & (1 << (row & 7)))
+
+    def append(self, value) -> None:
+        if self.length & 7 == 0:
+            self.nulls.append(0)
+        if value is None:
+            self.nulls[self.length >> 3] |= 1 << (self.length & 7)
+            self.values.append(0 if self.kind != KIND_OBJECT else None)
+            self.length += 1
+            return
+
+        kind = self._kind_of(value)
+        if kind != self.kind:
+            self._promote(kind)
+
+        if self.kind == KIND_TEXT:
+            index = self.pool_index.get(value)
+            if index is None:
+                index = self.pool_index[value] = len(self.pool)
+                self.pool.append(value)
+            self.values.append(index)
+        else:
+            self.values.append(value)
+        self.length += 1
+
+    def get(self, row: int):
+        if self.is_null(row):
+            return None
+        value = self.values[row]
+        if self.kind == KIND_TEXT:
+            return self.pool[value]
+        return value
+
+    def _kind_of(self, value) -> str:
+        if isinstance(value, int) and _INT_MIN <= value <= _INT_MAX:
+            return KIND_INT
+        if isinstance(value, float):
+            return KIND_REAL
+        if isinstance(value, str):
+            return KIND_TEXT
+        return KIND_OBJECT
+
+    def _promote(self, kind: str) -> None:
+        if self.kind == KIND_OBJECT:
+            return
+        if self.kind == KIND_NULL and kind != KIND_OBJECT:
+            # Every value so far is NULL, the placeholders can be reused
+            self.kind = kind
+            if kind == KIND_REAL:
+                self.values = array('d', bytes(8 * self.length))
+            return
+        # Mixed types, keep the boxed values
+        self.values = [self.get(row) for row in range(self.length)]
+        self.pool = []
+        self.pool_index = {}
+        self.kind = KIND_OBJECT
+
+    def nbytes(self) -> int:
+        """Approximate memory used by the column buffers"""
+        size = len(self.nulls)
+        if isinstance(self.values, array):
+            size += self.values.itemsize * len(self.values)
+        else:
+            size += 8 * len(self.values)
+        return size + sum(len(s) for s in self.pool)
+
+    def to_numpy(self):
+        """
+        Return the column as a numpy masked array (NULL -> masked), numpy
+        is optional and only needed for this.
+        """
+        if numpy is None:
+            raise ImportError('numpy is required for ColumnStore.to_numpy()')
+        mask = numpy.unpackbits(
+                numpy.frombuffer(bytes(self.nulls), dtype=numpy.uint8),
+                bitorder='little')[:self.length].astype(bool)
+        if self.kind in (KIND_NULL, KIND_INT):
+            data = numpy.frombuffer(self.values, dtype=numpy.int64)
+        elif self.kind == KIND_REAL:
+            data = numpy.frombuffer(self.values, dtype=numpy.float64)
+        elif self.kind == KIND_TEXT:
+            data = numpy.asarray(self.pool, dtype=object)[
+                    numpy.frombuffer(self.values, dtype=numpy.int64)] \
+                    if self.pool else numpy.empty(self.length, dtype=object)
+        else:
+            data = numpy.asarray(self.values, dtype=object)
+        return numpy.ma.MaskedArray(data, mask=mask)
+
+class ColumnStore:
+    def __init__(self, column_count: int):
+        self.columns = [Column() for _ in range(column_count)]
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def extend(self, rows: list) -> None:
+        columns = self.columns
+        for row in rows:
+            for column, value in zip(columns, row):
+                column.append(value)
+        self.length += len(rows)
+
+    def value(self, row: int, column: int):
+        return self.columns[column].get(row)
+
+    def row(self, row: int) -> tuple:
+        return tuple(column.get(row) for column in self.columns)
+
+    def kinds(self) -> list:
+        return [column.kind for column in self.columns]
+
+    def nbytes(self) -> int:
+        return sum(column.nbytes() for column in self.columns)
+
+if __name__ == "__main__":
+    print('Local [TEST]')
+    store = ColumnStore(3)
+    store.extend([(1, 'a', 1.5), (None, 'a', None), (3, 'b', 2.5)])
+    print([store.row(i) for i in range(len(store))], store.kinds())
@@ -8,7 +8,7 @@
 # https://doc.qt.io/qtforpython-6/overviews/qtwidgets-tools-customcompleter-example.html
 # [QSyntaxHighlighter]
 # https://doc.qt.io/qtforpython-6/examples/example_widgets_richtext_syntaxhighlighter.html
-# [QTextEdit->CodeEditor->ShowLineNumber]
+# [QPlainTextEdit->CodeEditor->ShowLineNumber]
 # https://doc.qt.io/qtforpython-6.2/examples/example_widgets__codeeditor.html
 # https://stackoverflow.com/questions/2443358/how-to-add-lines-numbers-to-qtextedit
 
@@ -18,16 +18,17 @@ from PySide6.QtCore import (
         Qt,
         QTextStream,
         QRect,
-        QRectF,
         QRegularExpression,
         QSize,
         QStringListModel,
+        QThreadPool,
+        QTimer,
         Signal,
         Slot)
 from PySide6.QtGui import (
         QAction,
+        QActionGroup,
         QColor,
-        QCursor,
         QFont,
         QFontMetricsF,
         QIcon,
@@ -45,10 +46,13 @@ from PySide6.QtWidgets import (
         QCompleter,
         QFileDialog,
         QGridLayout,
+        QInputDialog,
         QHeaderView,
+        QLabel,
         QMainWindow,
         QMessageBox,
         QPlainTextEdit,
+        QProgressDialog,
         QPushButton,
         QTableView,
         QTextEdit,
@@ -64,29 +68,56 @@ from pathlib import Path
 import csv
 import io
 import re
+import sqlite3
+import time
 
 if __name__ == '__main__':
     import customcompleter_rc
     import rc_icons
+    from completion import CompletionModel, statement_scope
+    from db.sql_lexer import iter_tokens
+    from db.db_export import FORMATS, available_formats, format_for
+    from db.db_metrics import metrics_log
+    from db.db_profiles import PROFILES
+    from db.db_schema import SchemaCatalog
     from db.db_query import Query
-    from highlighter import Highlighter
+    from highlighter import Highlighter, to_code_point, to_utf16
+    from large_file import LargeFileLoader
     from linenumber import LineNumberArea
+    from query_worker import ExportWorker, FetchWorker, QueryWorker, SchemaWorker
     from table_view import CustomTableView
+    from update_scheduler import UpdateScheduler
 else:
     from .import customcompleter_rc
     from .import rc_icons
+    from .completion import CompletionModel, statement_scope
+    from .db.sql_lexer import iter_tokens
+    from .db.db_export import FORMATS, available_formats, format_for
+    from .db.db_metrics import metrics_log
+    from .db.db_profiles import PROFILES
+    from .db.db_schema import SchemaCatalog
     from .db.db_query import Query
-    from .highlighter import Highlighter
+    from .highlighter import Highlighter, to_code_point, to_utf16
+    from .large_file import LargeFileLoader
     from .linenumber import LineNumberArea
+    from .query_worker import ExportWorker, FetchWorker, QueryWorker, SchemaWorker
     from .table_view import CustomTableView
+    from .update_scheduler import UpdateScheduler
+
+class TextEdit(QPlainTextEdit):
+
+    # Lines searched above and below the cursor for the statement being
+    # edited (see completionContext)
+    CONTEXT_BLOCKS = 200
 
-class TextEdit(QTextEdit):
     def __init__(self, parent=None, table: list=[]):
         super(TextEdit, self).__init__(parent)
 
         self.org = False
         self._completer = None
         isShortcut = None
+        # See setLargeFileMode
+        self.large_file = False
 
         # SQL Syntax Highlighter
         self._highlighter = Highlighter()
@@ -99,161 +130,134 @@ class TextEdit(QTextEdit):
         self.completerModel.setStringList(table)
         self.table_completer.setModel(self.completerModel)
 
+        # Signals only mark updates dirty, they run once per event loop pass
+        self.scheduler = UpdateScheduler(self)
+        self.scheduler.register('visible_blocks', self.highlightVisibleBlocks)
+        self.scheduler.register('line_numbers', self.updateLineNumberAreaWidth)
+        self.scheduler.register('current_line', self.highlight_current_line)
+        self.verticalScrollBar().valueChanged.connect(self.scheduleVisibleBlocks)
+        self.textChanged.connect(self.scheduleVisibleBlocks)
+
         # Show Line Numbers
         self.lineNumberArea = LineNumberArea(self)
-        self.document().blockCountChanged.connect(self.updateLineNumberAreaWidth)
-        self.verticalScrollBar().valueChanged.connect(self.updateLineNumberArea)
-        self.textChanged.connect(self.updateLineNumberArea)
-        self.cursorPositionChanged.connect(self.updateLineNumberArea)
+        self.blockCountChanged.connect(self.scheduleLineNumbers)
+        self.updateRequest.connect(self.updateLineNumberArea)
         self.highlight_current_line()
 
         # Highlight Current Line
-        self.cursorPositionChanged.connect(self.highlight_current_line)
+        self.cursorPositionChanged.connect(self.scheduleCurrentLine)
         self.updateLineNumberAreaWidth(0)
 
+    def scheduleLineNumbers(self):
+        self.scheduler.schedule('line_numbers')
+
+    def scheduleCurrentLine(self):
+        self.scheduler.schedule('current_line')
+
+    def scheduleVisibleBlocks(self):
+        if self.large_file:
+            self.scheduler.schedule('visible_blocks')
+
+    def setLargeFileMode(self, large_file: bool) -> None:
+        """
+        large_file: bool
+
+        Large files are not highlighted as a whole: the highlighter is
+        detached from the document (QSyntaxHighlighter would lex every
+        block as it is loaded) and only the blocks scrolled into view are
+        highlighted, see highlightVisibleBlocks.
+        """
+        self.large_file = large_file
+        if large_file:
+            self._highlighter.setDocument(None)
+            self.scheduleVisibleBlocks()
+        elif self._highlighter.document() is not self.document():
+            self._highlighter.setDocument(self.document())
+
+    def highlightVisibleBlocks(self, force: bool=False) -> None:
+        document = self.document()
+        block = self.firstVisibleBlock()
+        offset = self.contentOffset()
+        bottom = self.viewport().height()
+        while block.isValid():
+            if self._highlighter.format_block(block, force):
+                document.markContentsDirty(block.position(), block.length())
+            if self.blockBoundingGeometry(block).translated(offset).top() > bottom:
+                break
+            block = block.next()
+
     def lineNumberAreaWidth(self):
         digits = 1
-        m = max(1, self.document().blockCount())
+        m = max(1, self.blockCount())
         while m >= 10:
             m /= 10
             digits += 1
         space = 10 + self.fontMetrics().horizontalAdvance('9') * digits
         return space
 
-    def updateLineNumberAreaWidth(self, newBlockCount: int):
+    def updateLineNumberAreaWidth(self, newBlockCount: int=0):
         self.setViewportMargins(self.lineNumberAreaWidth(), 0, 0, 0)
 
-    def updateLineNumberAreaRect(self, rect_f: QRectF):
-        self.updateLineNumberArea()
-
-    def updateLineNumberAreaInt(self, slider_pos: int):
-        self.updateLineNumberArea()
-
-    def updateLineNumberArea(self):
+    def updateLineNumberArea(self, rect: QRect, dy: int):
         """
-        When the signal is emitted, the sliderPosition has been adjusted
-        according to the action, but the value has not yet been propagated
-        (meaning the valueChanged() signal was not yet emitted), and the visual
-        display has not been updated. In slots connected to self signal you can
-        thus safely adjust any action by calling setSliderPosition() yourself,
-        based on both the action and the slider's value.
+        updateRequest: the viewport scrolled by dy pixels or rect of it
+        has to be repainted, the line numbers follow.
         """
-
-        # Make sure the sliderPosition triggers one last time the valueChanged() signal with the actual value !!!!
-        self.verticalScrollBar().setSliderPosition(self.verticalScrollBar().sliderPosition())
-
-        # Since "QTextEdit" does not have an "updateRequest(...)" signal, we chose
-        # to grab the imformation from "sliderPosition()" and "contentsRect()".
-        # See the necessary connections used (Class constructor implementation part).
-
-        rect = self.contentsRect()
-
-        self.lineNumberArea.update(0, rect.y(), self.lineNumberArea.width(), rect.height())
-        self.updateLineNumberAreaWidth(0)
-
-        dy = self.verticalScrollBar().sliderPosition()
-        if dy > -1:
+        if dy:
             self.lineNumberArea.scroll(0, dy)
+        else:
+            self.lineNumberArea.update(0, rect.y(), self.lineNumberArea.width(), rect.height())
 
-        # Adjust slider to always see the number of the currently being edited line...
-        first_block_id = self.getFirstVisibleBlockId()
-        if first_block_id == 0 or self.textCursor().block().blockNumber() == first_block_id-1:
-            self.verticalScrollBar().setSliderPosition(dy-self.document().documentMargin())
+        if rect.contains(self.viewport().rect()):
+            self.updateLineNumberAreaWidth(0)
 
     def resizeEvent(self, event: QResizeEvent):
-        QTextEdit.resizeEvent(self, event)
+        QPlainTextEdit.resizeEvent(self, event)
+        self.scheduleVisibleBlocks()
 
         cr = self.contentsRect()
         self.lineNumberArea.setGeometry(QRect(cr.left(), cr.top(), self.lineNumberAreaWidth(), cr.height()))
 
     def getFirstVisibleBlockId(self) -> int:
-        # Detect the first block for which bounding rect - once translated
-        # in absolute coordinated - is contained by the editor's text area
-
-        # Costly way of doing but since "blockBoundingGeometry(...)" doesn't
-        # exists for "QTextEdit"...
-
-        curs = QTextCursor(self.document())
-        curs.movePosition(QTextCursor.Start)
-        for i in range(self.document().blockCount()):
-            block = curs.block()
-
-            r1 = self.viewport().geometry()
-            r2 = self.document().documentLayout().blockBoundingRect(block).translated(
-                    self.viewport().geometry().x(), self.viewport().geometry().y() - (
-                        self.verticalScrollBar().sliderPosition()
-                        )).toRect()
-
-            if r1.contains(r2, True):
-                return i
-
-            curs.movePosition(QTextCursor.NextBlock)
-        return 0
+        return self.firstVisibleBlock().blockNumber()
 
     def lineNumberAreaPaintEvent(self, event: QPaintEvent):
-        self.verticalScrollBar().setSliderPosition(self.verticalScrollBar().sliderPosition())
-
         painter = QPainter(self.lineNumberArea)
         font = painter.font()
         painter.fillRect(event.rect(), QColor(200, 200, 200))
-        blockNumber = self.getFirstVisibleBlockId()
-
-        block = self.document().findBlockByNumber(blockNumber)
-
-        if blockNumber > 0:
-            prev_block = self.document().findBlockByNumber(blockNumber - 1)
-        else:
-            prev_block = block
-
-        if blockNumber > 0:
-            translate_y = -self.verticalScrollBar().sliderPosition()
-        else:
-            translate_y = 0
 
-        top = self.viewport().geometry().top()
-
-        # Adjust text position according to the previous "non entirely visible" block
-        # if applicable. Also takes in consideration the document's margin offset.
-
-        if blockNumber == 0:
-            # Simply adjust to document's margin
-            additional_margin = self.document().documentMargin() -1 - self.verticalScrollBar().sliderPosition()
-        else:
-            # Getting the height of the visible part of the previous "non entirely visible" block
-            additional_margin = self.document().documentLayout().blockBoundingRect(prev_block) \
-                    .translated(0, translate_y).intersected(self.viewport().geometry()).height()
-
-        # Shift the starting point
-        top += additional_margin
-
-        bottom = top + int(self.document().documentLayout().blockBoundingRect(block).height())
+        block = self.firstVisibleBlock()
+        blockNumber = block.blockNumber()
+        offset = self.contentOffset()
+        top = self.blockBoundingGeometry(block).translated(offset).top()
+        bottom = top + self.blockBoundingRect(block).height()
 
         col_1 = QColor(0, 0, 0)      # Current line (Black)
         col_0 = QColor(120, 120, 120)    # Other lines  (custom darkgrey)
+        current = self.textCursor().blockNumber()
+        height = self.fontMetrics().height()
 
         # Draw the numbers (displaying the current line number in Black)
         while block.isValid() and top <= event.rect().bottom():
             if block.isVisible() and bottom >= event.rect().top():
                 number = f"{blockNumber + 1}"
-                painter.setPen(QColor(120, 120, 120))
 
-                font.setBold(False)
-
-                if self.textCursor().blockNumber() == blockNumber:
+                if current == blockNumber:
                     painter.setPen(col_1)
                     font.setBold(True)
                 else:
                     painter.setPen(col_0)
+                    font.setBold(False)
 
                 painter.setFont(font)
 
-                painter.drawText(-5, top,
-                                 self.lineNumberArea.width(), self.fontMetrics().height(),
+                painter.drawText(-5, int(top),
+                                 self.lineNumberArea.width(), height,
                                  Qt.AlignRight, number)
 
             block = block.next()
             top = bottom
-            bottom = top + int(self.document().documentLayout().blockBoundingRect(block).height())
+            bottom = top + self.blockBoundingRect(block).height()
             blockNumber += 1
 
     @Slot()
@@ -268,7 +272,7 @@ class TextEdit(QTextEdit):
         extra_selections = []
 
         if not self.isReadOnly():
-            selection = self.ExtraSelection()
+            selection = QTextEdit.ExtraSelection()
 
             line_color = QColor(200, 200, 200).lighter(110)
             selection.format.setBackground(line_color)
@@ -302,27 +306,21 @@ class TextEdit(QTextEdit):
         sql_format = QTextCharFormat()
         sql_format.setForeground(sql_color)
         # sql_format.setFontCapitalization(QFont.AllUppercase)
-        for word in kw:
-            pattern = fr'(\b{word}\b)'
-            self._highlighter.add_mapping(pattern, sql_format)
+        self._highlighter.set_words('keyword', kw, sql_format)
 
         table_format = QTextCharFormat()
         table_format.setForeground(table_color)
         #table_format.setFontWeight(QFont.Bold)
-        for word in table:
-            pattern = fr'(\b{word}\b)'
-            self._highlighter.add_mapping(pattern, table_format)
+        self._highlighter.set_words('table', table, table_format)
 
+        # Numbers, comments and strings are token kinds of db/sql_lexer.py
         digit_format = QTextCharFormat()
         digit_format.setForeground(digit_color)
-        #pattern = r"\b[^'\\]([0-9]+|[0-9]+\.[0-9]+)\b[^'\\]"
-        pattern = r"^\b(?=.)([+-]?([0-9]*)(\.([0-9]+))?)\b"
-        self._highlighter.add_mapping(pattern, digit_format)
+        self._highlighter.set_format('number', digit_format)
 
         comment_format = QTextCharFormat()
         comment_format.setForeground(comment_color)
-        pattern = r'--.*$'
-        self._highlighter.add_mapping(pattern, comment_format)
+        self._highlighter.set_format('comment', comment_format)
 
 #        pattern = r'/\*(.*)\*/'
 #        self._highlighter.add_mapping(pattern, comment_format)
@@ -338,7 +336,10 @@ class TextEdit(QTextEdit):
         #     pattern = fr'(\b{word}\b)'
         #     self._highlighter.add_mapping(pattern, column_format)
 
-        self._highlighter.setDocument(self.document())
+        if self.large_file:
+            self.highlightVisibleBlocks(force=True)
+        elif self._highlighter.document() is not self.document():
+            self._highlighter.setDocument(self.document())
 
     def insertFromMimeData(self, source):
         """
@@ -349,12 +350,6 @@ class TextEdit(QTextEdit):
         """
         if source.hasText():
             self.insertPlainText(source.text())
-        elif source.hasImage():
-            cursor = self.textCursor()
-            image = source.imageData()
-            cursor.insertImage(image)
-        else:
-            return
         return
 
     def setCompleter(self, c):
@@ -364,12 +359,18 @@ class TextEdit(QTextEdit):
         self._completer = c
 
         c.setWidget(self)
-        c.setCompletionMode(QCompleter.PopupCompletion)
+        c.setCompletionMode(self.completionMode(c))
         c.activated.connect(self.insertCompletion)
 
     def completer(self):
         return self._completer
 
+    def completionMode(self, c) -> QCompleter.CompletionMode:
+        # A CompletionModel filters itself (see keyPressEvent)
+        if isinstance(c.model(), CompletionModel):
+            return QCompleter.UnfilteredPopupCompletion
+        return QCompleter.PopupCompletion
+
     def insertCompletion(self, completion):
         if self._completer.widget() is not self:
             return
@@ -377,8 +378,13 @@ class TextEdit(QTextEdit):
         extra = len(completion) - len(self._completer.completionPrefix())
 
         tc = self.textCursor()
+        if not self._completer.completionPrefix():
+            # Columns offered after 'alias.'
+            tc.insertText(completion)
+            self.setTextCursor(tc)
+            return
         if not self.char_check:
-            tc.select(QTextCursor.WordUnderCursor)
+            tc = self.wordCursor()
             tc.insertText(completion)
             return
 
@@ -387,11 +393,65 @@ class TextEdit(QTextEdit):
         tc.insertText(completion[-extra:])
         self.setTextCursor(tc)
 
-    def textUnderCursor(self):
+    def wordCursor(self) -> QTextCursor:
+        """
+        Cursor selecting the word characters around the cursor,
+        WordUnderCursor selects punctuation too (';' in 'u.v|;')
+        """
         tc = self.textCursor()
-        tc.select(QTextCursor.WordUnderCursor)
+        text = tc.block().text()
+        column = to_code_point(text, tc.positionInBlock())
+        start = re.search(r'\w*$', text[:column]).start()
+        end = column + re.match(r'\w*', text[column:]).end()
+        tc.setPosition(tc.block().position() + to_utf16(text, start))
+        tc.setPosition(tc.block().position() + to_utf16(text, end), QTextCursor.KeepAnchor)
+        return tc
+
+    def textUnderCursor(self):
+        return self.wordCursor().selectedText()
 
-        return tc.selectedText()
+    def completionContext(self, prefix_length: int) -> tuple:
+        """
+        prefix_length: int (length of the word being completed)
+
+        Return (scope, qualifier) for CompletionModel.setPrefix: the
+        tables of the statement under the cursor (completion.statement_scope)
+        and the table or alias the word is qualified with ('u' in u.vis).
+        Only the lines up to the closest ';' around the cursor are lexed.
+        """
+        cursor = self.textCursor()
+        position = cursor.position()
+        first = last = cursor.block()
+        for _ in range(TextEdit.CONTEXT_BLOCKS):
+            if not first.previous().isValid() or ';' in first.previous().text():
+                break
+            first = first.previous()
+        if first.previous().isValid():
+            # The statement may start after the ';'
+            first = first.previous()
+        for _ in range(TextEdit.CONTEXT_BLOCKS):
+            if ';' in last.text() or not last.next().isValid():
+                break
+            last = last.next()
+
+        start = first.position()
+        cursor.setPosition(start)
+        cursor.setPosition(last.position() + last.length() - 1, QTextCursor.KeepAnchor)
+        text = cursor.selectedText().replace('\u2029', '\n')
+        offset = to_code_point(text, position - start) - prefix_length
+        begin, end = 0, len(text)
+        for kind, token_start, token_end in iter_tokens(text):
+            if kind != 'semicolon':
+                continue
+            if token_end <= offset:
+                begin = token_end
+            else:
+                end = token_start
+                break
+
+        match = re.search(r'(\w+|"[^"]*"|`[^`]*`|\[[^\]]*\])\.$', text[begin:offset])
+        qualifier = match.group(1).strip('"`[]') if match else None
+        return statement_scope(text[begin:end]), qualifier
 
     def focusInEvent(self, e):
         if self._completer is not None:
@@ -435,8 +495,11 @@ class TextEdit(QTextEdit):
         hasModifier = (e.modifiers() != Qt.NoModifier) and not ctrlOrShift
         completionPrefix = self.textUnderCursor()
 
-        self._completer.setModelSorting(QCompleter.CaseInsensitivelySortedModel)
-        self._completer.setCompletionMode(QCompleter.PopupCompletion)
+        model = self._completer.model()
+        filtered = isinstance(model, CompletionModel)
+        if not filtered:
+            self._completer.setModelSorting(QCompleter.CaseInsensitivelySortedModel)
+        self._completer.setCompletionMode(self.completionMode(self._completer))
 
         # If current text is lower/upper or mixed set CaseSensitive or
         # CaseInsensitive accordingly
@@ -448,7 +511,13 @@ class TextEdit(QTextEdit):
         else:
             self._completer.setCaseSensitivity(Qt.CaseInsensitive)
 
-        if not isShortcut and (hasModifier or len(e.text()) == 0 or len(completionPrefix) < 1 or e.text()[-1] in eow):
+        # Typing the dot of 'alias.' offers the columns of its table
+        qualified = filtered and e.text() == '.' and not hasModifier
+        if qualified:
+            completionPrefix = ''
+            self.char_check = cc = False
+
+        if not isShortcut and not qualified and (hasModifier or len(e.text()) == 0 or len(completionPrefix) < 1 or e.text()[-1] in eow):
             self._completer.popup().hide()
             return
 
@@ -462,7 +531,13 @@ class TextEdit(QTextEdit):
                 self.org = False
                 return
 
-        if completionPrefix != self._completer.completionPrefix():
+        if qualified or completionPrefix != self._completer.completionPrefix():
+            if filtered:
+                scope, qualifier = self.completionContext(len(completionPrefix))
+                model.setPrefix(completionPrefix, bool(cc), scope, qualifier)
+                if not model.rowCount():
+                    self._completer.popup().hide()
+                    return
             self._completer.setCompletionPrefix(completionPrefix)
             index = self._completer.completionModel().index(0, 0)
             self._completer.popup().setCurrentIndex(index)
@@ -484,28 +559,45 @@ class TextEdit(QTextEdit):
 
 class MainWindow(QMainWindow, Query):
     closed = Signal()
+    # Keywords and schema loaded, completion and highlighting work
+    ready = Signal()
+    # Windows opened with File -> New Window
+    windows = []
+    # Scripts larger than this are opened in large-file mode (bytes), a
+    # script just under it is set and highlighted on the GUI thread in
+    # about a second (benchmarks/suite.py open_file)
+    LARGE_FILE_SIZE = 2**20
+
     def __init__(self, parent=None):
         super(MainWindow, self).__init__(parent)
 
         self.create_actions()
         self.createMenu()
 
-        sqlcursor = self.con.cursor()
-        query = (
-                'SELECT name '
-                'FROM sqlite_schema '
-                'WHERE type="table" AND '
-                'name NOT LIKE "sqlite_%" '
-                'ORDER BY name;'
-                )
-        out = sqlcursor.execute(query)
-        self.table_list = [table[0] for table in out]
-        self.table_list.extend([table.upper() for table in self.table_list])
+        # Queries run off the GUI thread, one at a time (single connection)
+        self.query_pool = QThreadPool(self)
+        self.query_pool.setMaxThreadCount(1)
+        # Keep the thread (and its reader connection) alive between queries
+        self.query_pool.setExpiryTimeout(-1)
+        self.query_worker = None
+        # Result pages are fetched off the GUI thread, on one thread so the
+        # pages and the close of a cursor never overlap (see fetchRows)
+        self.fetch_pool = QThreadPool(self)
+        self.fetch_pool.setMaxThreadCount(1)
+        self.page_fetches = 0
+        self.columnar = False
+        # Progress of the running export (see exportResults)
+        self.export_dialog = None
+
+        # Large scripts (see openLargeFile)
+        self.loader = None
+
+        # The keywords and the schema are loaded once the window is shown
+        # (see loadCompletion), until then nothing is completed
+        self.catalog = SchemaCatalog()
+        self.table_list = []
         self.all_tables = []
-        sqlcursor.close()
-
-        # SQL Current DB Table Syntax Highlighter
-        self.table_list.sort()
+        self.list_copy = []
 
         # Init TextEdit passing the List of Tables (Variable: table)
         # If Ctrl-P (Shortcut) then it will popup autocompletion
@@ -514,40 +606,38 @@ class MainWindow(QMainWindow, Query):
         self.completingTextEdit.installEventFilter(self)
 
         self.completer = QCompleter(self)
-        self.completerModel = self.modelFromFile(':/resources/wordlist.txt')
-        self.completer_list = self.completerModel.stringList()
-
-        # SQL KeyWord Syntax Highlighter
-        self.list_copy = self.completer_list.copy()
-        self.list_copy.sort()
-
-        self.completer_list.extend(self.table_list)
-        self.completer_list.sort(key=len)
-        self.completerModel.setStringList(self.completer_list)
-        # print(completerModel.stringList())
+        self.completerModel = CompletionModel(parent=self.completer)
         self.completer.setModel(self.completerModel)
         self.completer.setWrapAround(False)
 
-        self.completingTextEdit.setup_editor(kw=self.list_copy, table=self.table_list)
-
         self.completingTextEdit.setCompleter(self.completer)
-
-        # Signals
-        self.completingTextEdit.textChanged.connect(self.addColumnData)
-        self.completingTextEdit.cursorPositionChanged.connect(self.textPasted)
+        QTimer.singleShot(0, self.loadCompletion)
+
+        # Signals (coalesced by the editor's UpdateScheduler)
+        scheduler = self.completingTextEdit.scheduler
+        scheduler.register('columns', self.addColumnData)
+        scheduler.register('paste', self.textPasted)
+        self.completingTextEdit.textChanged.connect(
+                lambda: scheduler.schedule('columns'))
+        self.completingTextEdit.cursorPositionChanged.connect(
+                lambda: scheduler.schedule('paste'))
         self.last_position = None
 
         # Buttons
         self.btn_query = QPushButton('Execute')
+        self.btn_cancel = QPushButton('Cancel')
+        self.btn_cancel.setEnabled(False)
         self.btn_close = QPushButton('Close')
         self.btn_hide = QPushButton('Hide Table Data')
 
         # Button Shortcuts
         self.btn_query.setShortcut(QKeySequence(QKeySequence(Qt.CTRL|Qt.Key_R)))
+        self.btn_cancel.setShortcut(QKeySequence(Qt.CTRL|Qt.SHIFT|Qt.Key_R))
 
         # Buttons Functionality
         self.btn_close.clicked.connect(self.close)
         self.btn_query.clicked.connect(self.executeQuery)
+        self.btn_cancel.clicked.connect(self.cancelQuery)
         self.btn_hide.clicked.connect(self.toggle_table_visibility)
 
         # Scroll Area
@@ -564,7 +654,8 @@ class MainWindow(QMainWindow, Query):
 
         # Grid layout
         self.glayout = QGridLayout()
-        self.glayout.addWidget(self.btn_query, 0, 0, 1, 2)
+        self.glayout.addWidget(self.btn_query, 0, 0, 1, 1)
+        self.glayout.addWidget(self.btn_cancel, 0, 1, 1, 1)
         self.glayout.addWidget(self.btn_close, 0, 2, 1, 1)
         self.glayout.addWidget(self.completingTextEdit, 1, 0, 1, 3)
         self.glayout.addWidget(self.scroll, 2, 0, 1, 3)
@@ -574,12 +665,122 @@ class MainWindow(QMainWindow, Query):
         widget.setLayout(self.glayout)
         self.setCentralWidget(widget)
 
+        # Metrics of the last statement (db/db_metrics.py), the tooltip
+        # lists the previous ones
+        self.metrics = None
+        self.metrics_label = QLabel()
+        self.statusBar().addPermanentWidget(self.metrics_label)
+
         self.completingTextEdit.setFocus()
         self.resize(500, 300)
-        self.setWindowTitle("DMNIX* DB Editor")
+        self.setWindowTitle(self.windowName())
+
+    def loadTables(self, catalog: SchemaCatalog=None) -> list:
+        # Tables and views of the schema catalog (db/db_schema.py)
+        self.catalog = catalog or self.database.schema()
+        table_list = self.catalog.names()
+        table_list.extend([table.upper() for table in table_list])
+
+        # SQL Current DB Table Syntax Highlighter
+        table_list.sort()
+        return table_list
+
+    def windowName(self) -> str:
+        snapshot = ' (snapshot)' if self.database.snapshot else ''
+        return f"DMNIX* DB Editor - {Path(self.db).name}{snapshot}"
+
+    def openSnapshot(self) -> None:
+        self.openDatabase(snapshot=True)
+
+    def setProfile(self, action: QAction) -> None:
+        # Reopen the current database with the PRAGMA profile (the key
+        # is the action data, the label may be translated or get a '&')
+        self.openDatabase(self.db, bool(self.database.snapshot), action.data())
+
+    def openDatabase(self, path: str="", snapshot: bool=False, profile: str=None) -> None:
+        file_name = path
+        if not file_name:
+            file_name, _ = QFileDialog.getOpenFileName(
+                    self, self.tr("Open Database"), "", "All Files (*)")
+        if not file_name:
+            return
+
+        self.cancel()
+        self.query_pool.waitForDone()
+        for table in self.scroll.findChildren(QTableView):
+            table.model().close()
+        self.fetch_pool.waitForDone()
+        try:
+            self.use_database(file_name, snapshot, profile or self.database.profile)
+        except (sqlite3.Error, OSError) as error:
+            QMessageBox.warning(
+                    self, self.tr("Open Database"),
+                    f'Cannot open {file_name}: {error}')
+            return
+        self.setWindowTitle(self.windowName())
+        self.loadSchema()
+
+    def loadCompletion(self) -> None:
+        """
+        Startup work done after the first paint: the keywords are read
+        from the resources, the schema is read on the query thread (which
+        opens its read connection at the same time), see schemaLoaded.
+        """
+        self.list_copy = sorted(self.wordsFromFile(':/resources/wordlist.txt'))
+        self.completerModel.setWords(self.list_copy)
+        self.completingTextEdit.setup_editor(kw=self.list_copy)
+
+        self.startSchemaWorker(self.schemaLoaded)
+
+    def startSchemaWorker(self, slot) -> None:
+        worker = SchemaWorker(self.database)
+        worker.signals.result.connect(slot)
+        worker.signals.error.connect(self.queryError)
+        self.query_pool.start(worker)
+
+    def schemaLoaded(self, result: tuple) -> None:
+        database, catalog = result
+        if database is not self.database:
+            # Another database was opened meanwhile
+            return
+        self.loadSchema(catalog)
+        if not self.completingTextEdit.large_file:
+            # A script opened before the schema was there
+            self.textPasted(whole=True)
+        self.ready.emit()
+
+    def schemaReloaded(self, result: tuple) -> None:
+        database, catalog = result
+        if database is not self.database or catalog is self.catalog:
+            return
+        self.loadSchema(catalog)
+
+    def loadSchema(self, catalog: SchemaCatalog=None) -> None:
+        """Reload the table names and keywords of the completer and highlighter"""
+        self.table_list = self.loadTables(catalog)
+        self.all_tables = []
+        self.completingTextEdit.completerModel.setStringList(self.table_list)
+        self.completerModel.setWords(self.list_copy + self.table_list)
+        self.completerModel.setColumnSource(self.catalog.columns)
+        self.completingTextEdit.setup_editor(kw=self.list_copy, table=self.table_list)
+
+    def newWindow(self) -> None:
+        # Every window has its own database and query thread
+        window = MainWindow()
+        window.resize(self.size())
+        window.setAttribute(Qt.WA_DeleteOnClose)
+        MainWindow.windows.append(window)
+        window.closed.connect(lambda: MainWindow.windows.remove(window))
+        window.show()
 
     def closeEvent(self, event: QEvent):
         self.closed.emit()
+        self.stopLoading()
+        self.cancel()
+        self.query_pool.waitForDone()
+        for table in self.scroll.findChildren(QTableView):
+            table.model().close()
+        self.fetch_pool.waitForDone()
         self.close_connection()
         super().closeEvent(event)
         #self.close()
@@ -616,39 +817,21 @@ class MainWindow(QMainWindow, Query):
             last_position = self.last_position
             self.last_position = None
             # print(f'{last_position=} {position=}')
-            text = self.completingTextEdit.toPlainText()[last_position:position]
-
-        tables = {table for table in self.table_list if table in text}
-        if tables:
-            for table in tables:
-                if table not in self.all_tables:
-                    self.all_tables.append(table)
-                    sqlcursor = self.con.cursor()
-                    print(f'{self.all_tables[-1]}')
-                    query = (
-                            'SELECT name '
-                            f'FROM pragma_table_info("{table}") '
-                            'ORDER BY name;'
-                            )
-                    out = sqlcursor.execute(query)
-                    table_cols = [column[0] for column in out]
-                    print(f'{table_cols}\n')
-                    table_cols.extend([column.upper() for column in table_cols])
-                    table_cols.sort()
-
-                    # SQL Syntax Highlighter (Columns)
-                    # self.completingTextEdit.setup_editor(column=table_cols)
-
-                    dups = set(self.completer_list)
-                    dups.update(table_cols)
-                    self.completer_list = list(dups)
-                    self.completer_list.sort(key=len)
-
-                    self.completerModel.setStringList(self.completer_list)
-                    self.completingTextEdit.setCompleter(self.completer)
-                    sqlcursor.close()
+            text = self.completingTextEdit.toPlainText()
+            text = text[to_code_point(text, last_position):to_code_point(text, position)]
+
+        self.addTables(self.catalog.matcher().find(text))
         return
 
+    def addTables(self, tables) -> None:
+        """Index the columns of the tables for QCompleter"""
+        for table in tables:
+            if table not in self.all_tables:
+                self.all_tables.append(table)
+                # Columns are offered once the table is in the scope of
+                # the statement being edited, index them now
+                self.completerModel.column_index.trie(table)
+
     def copySelection(self, source: QTableView)  -> str:
         selection = source.selectedIndexes()
         if selection:
@@ -677,32 +860,8 @@ class MainWindow(QMainWindow, Query):
         cursor = self.completingTextEdit.textCursor()
         cursor.select(QTextCursor.WordUnderCursor)
         selected_text = cursor.selectedText().strip()
-        if selected_text in self.table_list and selected_text not in self.all_tables:
-            self.all_tables.append(selected_text)
-            sqlcursor = self.con.cursor()
-            print(f'{self.all_tables[-1]}')
-            query = (
-                    'SELECT name '
-                    f'FROM pragma_table_info("{selected_text}") '
-                    'ORDER BY name;'
-                    )
-            out = sqlcursor.execute(query)
-            table_cols = [column[0] for column in out]
-            print(f'{table_cols}\n')
-            table_cols.extend([column.upper() for column in table_cols])
-            table_cols.sort()
-
-            # SQL Syntax Highlighter (Columns)
-            # self.completingTextEdit.setup_editor(column=table_cols)
-
-            dups = set(self.completer_list)
-            dups.update(table_cols)
-            self.completer_list = list(dups)
-            self.completer_list.sort(key=len)
-
-            self.completerModel.setStringList(self.completer_list)
-            self.completingTextEdit.setCompleter(self.completer)
-            sqlcursor.close()
+        if selected_text in self.table_list:
+            self.addTables([selected_text])
 
     def toggle_table_visibility(self) -> None:
         f = False
@@ -726,57 +885,220 @@ class MainWindow(QMainWindow, Query):
         self.glayout.setRowStretch(1,50)
         self.glayout.setRowStretch(2,50)
 
-    def fillTable(self, data: list=[]) -> None:
+    def clearTables(self) -> None:
         for i in range(self.vlayout.count()):
             if i == 0:
                 continue
             child = self.vlayout.itemAt(i).widget()
             if isinstance(child, QTableView):
             # print(child)
+                child.model().close()
                 child.deleteLater()
-        if isinstance(data, list):
-            self.scroll.setVisible(True)
-            self.btn_hide.setText('Hide Table Data')
-            self.vlayout.addWidget(self.btn_hide)
-            self.glayout.setRowStretch(0,1)
-            self.glayout.setRowStretch(1,30)
-            self.glayout.setRowStretch(2,60)
-            for record, cursor in data:
-                table = QTableView()
-                table.setAlternatingRowColors(True)
-                table.installEventFilter(self)
-                table.setMinimumSize(QSize(100,300))
-                self.vlayout.addWidget(table)
-                d = record, cursor
-                model = CustomTableView(d)
-                table.setModel(model)
-                horizontal_header = table.horizontalHeader()
-                vertical_header = table.verticalHeader()
-                if horizontal_header:
-                    horizontal_header.setSectionResizeMode(
-                            #QHeaderView.Interactive
-                            QHeaderView.ResizeToContents
-                            )
-                    horizontal_header.setStretchLastSection(False)
-                if vertical_header:
-                    vertical_header.setSectionResizeMode(
-                            QHeaderView.Interactive
-                            )
-                cursor.close()
+        self.scroll.setVisible(True)
+        self.btn_hide.setText('Hide Table Data')
+        self.vlayout.addWidget(self.btn_hide)
+        self.glayout.setRowStretch(0,1)
+        self.glayout.setRowStretch(1,30)
+        self.glayout.setRowStretch(2,60)
+
+    @Slot(object)
+    def fillTable(self, data: tuple) -> None:
+        """Render one result set (headers, cursor, first_rows) as soon as it arrives"""
+        st = time.perf_counter()
+        table = QTableView()
+        table.setAlternatingRowColors(True)
+        table.installEventFilter(self)
+        table.setMinimumSize(QSize(100,300))
+        self.vlayout.addWidget(table)
+        model = CustomTableView(data, columnar=self.columnar, pager=self)
+        table.setModel(model)
+        horizontal_header = table.horizontalHeader()
+        vertical_header = table.verticalHeader()
+        if horizontal_header:
+            horizontal_header.setSectionResizeMode(
+                    #QHeaderView.Interactive
+                    QHeaderView.ResizeToContents
+                    )
+            horizontal_header.setStretchLastSection(False)
+        if vertical_header:
+            vertical_header.setSectionResizeMode(
+                    QHeaderView.Interactive
+                    )
+
+        metrics = getattr(data[1], 'metrics', None)
+        if metrics is not None:
+            metrics.rendered(time.perf_counter() - st)
+            self.metrics = metrics
+            self.showMetrics()
+
+    def showMetrics(self) -> None:
+        if self.metrics is None:
             return
+        self.metrics_label.setText(self.metrics.summary())
+        recent = list(metrics_log.recent)[-10:]
+        self.metrics_label.setToolTip('\n'.join(
+                f'{" ".join(metrics.sql.split())[:60]}: {metrics.summary()}'
+                for metrics in reversed(recent)))
 
     def executeQuery(self) -> None:
+        if self.query_worker is not None:
+            # A query is already running
+            return
         text = self.completingTextEdit.toPlainText()
-        if text:
-            data = self.query_exe(text)
-        else:
+        if not text.strip():
             # Return if TextEdit is empty
             return
-        if data and isinstance(data, list):
-            self.fillTable(data=data)
+        self.clearTables()
+        self.reset_cancel()
+        self.btn_query.setEnabled(False)
+        self.btn_cancel.setEnabled(True)
+        # The script is split into statements by the worker
+        self.query_worker = QueryWorker(
+                self, text, CustomTableView.ROW_BATCH_COUNT)
+        self.query_worker.signals.result.connect(self.fillTable)
+        self.query_worker.signals.error.connect(self.queryError)
+        self.query_worker.signals.schema.connect(self.schemaVersion)
+        self.query_worker.signals.finished.connect(self.queryFinished)
+        self.query_pool.start(self.query_worker)
+
+    def exportResults(self) -> None:
+        """Stream the rows of the statement under the cursor to a file"""
+        if self.query_worker is not None:
+            # A query is already running
             return
-        print(f'Empty: {data=}')
-        return
+        text = self.completingTextEdit.toPlainText()
+        if not text.strip():
+            return
+
+        formats = available_formats()
+        file_name, selected = QFileDialog.getSaveFileName(
+                self, self.tr("Export Results"), "",
+                ';;'.join(FORMATS[name][0] for name in formats))
+        if not file_name:
+            return
+        fmt = format_for(file_name)
+        if Path(file_name).suffix.lower() != FORMATS[fmt][1] or fmt not in formats:
+            # No (known) extension, use the one of the selected filter
+            fmt = next((name for name in formats if FORMATS[name][0] == selected), 'csv')
+            file_name += FORMATS[fmt][1]
+
+        self.reset_cancel()
+        self.btn_query.setEnabled(False)
+        self.btn_cancel.setEnabled(True)
+        # Busy indicator, the number of rows is only known at the end
+        self.export_dialog = QProgressDialog(
+                f'Exporting to {Path(file_name).name}...',
+                self.tr("Cancel"), 0, 0, self)
+        self.export_dialog.setWindowModality(Qt.WindowModal)
+        self.export_dialog.setMinimumDuration(500)
+        self.export_dialog.canceled.connect(self.cancelQuery)
+        # The statement under the cursor is found by the worker
+        self.query_worker = ExportWorker(
+                self, text, self.completingTextEdit.textCursor().position(),
+                file_name, fmt)
+        self.query_worker.signals.progress.connect(self.exportProgress)
+        self.query_worker.signals.result.connect(self.exportDone)
+        self.query_worker.signals.error.connect(self.exportError)
+        self.query_worker.signals.finished.connect(self.exportFinished)
+        self.query_pool.start(self.query_worker)
+
+    @Slot(int)
+    def exportProgress(self, rows: int) -> None:
+        if self.export_dialog is not None:
+            self.export_dialog.setLabelText(f'{rows:,} rows exported')
+        self.statusBar().showMessage(f'Exporting: {rows:,} rows')
+
+    @Slot(object)
+    def exportDone(self, result: tuple) -> None:
+        path, rows = result
+        self.statusBar().showMessage(f'Exported {rows:,} rows to {path}', 5000)
+
+    @Slot(str, int)
+    def exportError(self, message: str, offset: int) -> None:
+        self.statusBar().clearMessage()
+        if self.is_cancelled():
+            return
+        QMessageBox.warning(self, self.tr("Export Results"), message)
+
+    @Slot()
+    def exportFinished(self) -> None:
+        if self.is_cancelled():
+            self.statusBar().showMessage('Export cancelled', 5000)
+        if self.export_dialog is not None:
+            self.export_dialog.canceled.disconnect(self.cancelQuery)
+            self.export_dialog.close()
+            self.export_dialog.deleteLater()
+            self.export_dialog = None
+        self.queryFinished()
+
+    def cancelQuery(self) -> None:
+        if self.query_worker is not None:
+            # The result grids of the last query stay open during an export
+            self.cancel(interrupt=not isinstance(self.query_worker, ExportWorker))
+        elif self.page_fetches:
+            # Only the page being fetched, the grids keep their rows
+            self.cancel(interrupt=False)
+
+    def fetchRows(self, cursor, count: int, callback) -> None:
+        """Fetch the next count rows of a result grid (CustomTableView pager)"""
+        worker = FetchWorker(self, cursor, count)
+        worker.signals.result.connect(lambda rows: callback(cursor, rows))
+        worker.signals.error.connect(self.fetchError)
+        worker.signals.finished.connect(self.fetchFinished)
+        self.page_fetches += 1
+        self.btn_cancel.setEnabled(True)
+        self.fetch_pool.start(worker)
+
+    def closeCursor(self, cursor) -> None:
+        self.fetch_pool.start(cursor.close)
+
+    @Slot(str, int)
+    def fetchError(self, message: str, offset: int) -> None:
+        self.statusBar().showMessage(message, 5000)
+
+    @Slot()
+    def fetchFinished(self) -> None:
+        self.page_fetches -= 1
+        if not self.page_fetches and self.query_worker is None:
+            self.reset_cancel()
+            self.btn_cancel.setEnabled(False)
+
+    def setQueryTimeout(self) -> None:
+        timeout, ok = QInputDialog.getInt(
+                self, self.tr("Statement Timeout"),
+                self.tr("Seconds (0 = no limit):"),
+                int(self.timeout or 0), 0, 86400)
+        if ok:
+            self.timeout = timeout or None
+
+    def setColumnar(self, checked: bool) -> None:
+        # Applies to the result sets of the next query
+        self.columnar = checked
+
+    @Slot(str, int)
+    def queryError(self, message: str, offset: int) -> None:
+        print(message)
+        # Move the cursor to the statement that failed
+        cursor = self.completingTextEdit.textCursor()
+        text = self.completingTextEdit.toPlainText()
+        cursor.setPosition(to_utf16(text, min(offset, len(text))))
+        self.completingTextEdit.setTextCursor(cursor)
+
+    @Slot()
+    def queryFinished(self) -> None:
+        self.query_worker = None
+        self.reset_cancel()
+        self.btn_query.setEnabled(True)
+        # Still cancels the pages being fetched
+        self.btn_cancel.setEnabled(bool(self.page_fetches))
+        self.showMetrics()
+
+    @Slot(int)
+    def schemaVersion(self, schema_version: int) -> None:
+        if schema_version != self.catalog.schema_version:
+            # The statements created, altered or dropped tables, read the
+            # catalog again on the query thread
+            self.startSchemaWorker(self.schemaReloaded)
 
     def newFile(self) -> None:
         for i in range(self.vlayout.count()):
@@ -787,7 +1109,9 @@ class MainWindow(QMainWindow, Query):
         self.glayout.setRowStretch(0,1)
         self.glayout.setRowStretch(1,50)
         self.glayout.setRowStretch(2,0)
+        self.stopLoading()
         self.completingTextEdit.clear()
+        self.completingTextEdit.setLargeFileMode(False)
         self.completingTextEdit.setFocus()
 
     def openFile(self, path: str="") -> None:
@@ -800,18 +1124,55 @@ class MainWindow(QMainWindow, Query):
             file_name, _ = QFileDialog.getOpenFileName(
                     self, self.tr("Open File"), "", "SQL Files (*.sql)")
 
+        self.scroll.setVisible(False)
+        self.glayout.setRowStretch(0,1)
+        self.glayout.setRowStretch(1,50)
+        self.glayout.setRowStretch(2,0)
+
         if file_name:
+            self.stopLoading()
+            try:
+                size = Path(file_name).stat().st_size
+            except OSError:
+                # Missing or unreadable, as QFile.open failing did
+                size = 0
+            if size > MainWindow.LARGE_FILE_SIZE:
+                self.openLargeFile(file_name)
+                return
             in_file = QFile(file_name)
             if in_file.open(QFile.ReadOnly | QFile.Text):
                 stream = QTextStream(in_file)
                 self.completingTextEdit.setPlainText(stream.readAll())
+                self.completingTextEdit.setLargeFileMode(False)
 
-        self.scroll.setVisible(False)
-        self.glayout.setRowStretch(0,1)
-        self.glayout.setRowStretch(1,50)
-        self.glayout.setRowStretch(2,0)
         self.textPasted(whole=True)
 
+    def openLargeFile(self, file_name: str) -> None:
+        """
+        file_name: str
+
+        The script is appended to the editor in chunks (LargeFileLoader)
+        and highlighted only where it is visible.
+        """
+        self.completingTextEdit.setLargeFileMode(True)
+        self.loader = LargeFileLoader(file_name, self.completingTextEdit.document(), self)
+        self.loader.progress.connect(self.loadingProgress)
+        self.loader.finished.connect(self.loadingFinished)
+        self.loader.start()
+
+    def loadingProgress(self, loaded: int, size: int) -> None:
+        self.statusBar().showMessage(f'Loading {loaded * 100 // max(size, 1)}%')
+
+    def loadingFinished(self) -> None:
+        self.statusBar().showMessage('Loaded', 2000)
+        self.loader = None
+
+    def stopLoading(self) -> None:
+        if self.loader is not None:
+            self.loader.stop()
+            self.loader = None
+            self.statusBar().clearMessage()
+
     def create_actions(self) -> None:
         icon = QIcon.fromTheme('document-new', QIcon(':/images/new.png'))
         self._new_query = QAction(
@@ -831,6 +1192,55 @@ class MainWindow(QMainWindow, Query):
                 triggered=self.openFile
                 )
 
+        self._export_results = QAction(
+                "&Export Results...",
+                self, shortcut="Ctrl+E",
+                statusTip="Write the rows of the statement under the cursor to a file",
+                triggered=self.exportResults
+                )
+
+        self._query_timeout = QAction(
+                "Statement &Timeout...",
+                self,
+                statusTip="Interrupt statements running longer than this",
+                triggered=self.setQueryTimeout
+                )
+
+        self._clear_cache = QAction(
+                "C&lear Result Cache",
+                self,
+                statusTip="Forget cached query results",
+                triggered=lambda: self.database.cache.clear()
+                )
+
+        self._columnar_results = QAction(
+                "&Columnar Result Storage",
+                self, checkable=True,
+                statusTip="Store result rows in typed per-column arrays",
+                toggled=self.setColumnar
+                )
+
+        self._open_database = QAction(
+                "Open &Database...",
+                self,
+                statusTip="Query another SQLite database in this window",
+                triggered=self.openDatabase
+                )
+
+        self._open_snapshot = QAction(
+                "Open Database &Snapshot...",
+                self,
+                statusTip="Query a read-only copy of a (locked) database",
+                triggered=self.openSnapshot
+                )
+
+        self._new_window = QAction(
+                "New &Window",
+                self,
+                statusTip="Open another editor window",
+                triggered=self.newWindow
+                )
+
         icon = QIcon.fromTheme('application-exit', QIcon(':/images/application-exit.svg'))
         self._quit_app = QAction(
                 icon,
@@ -844,30 +1254,37 @@ class MainWindow(QMainWindow, Query):
         file_menu = self.menuBar().addMenu(self.tr("&File"))
         file_menu.addAction(self._new_query)
         file_menu.addAction(self._open_file)
+        file_menu.addAction(self._open_database)
+        file_menu.addAction(self._open_snapshot)
+        file_menu.addAction(self._new_window)
         file_menu.addSeparator()
         file_menu.addAction(self._quit_app)
 
-    def modelFromFile(self, fileName: str) -> QStringListModel:
+        query_menu = self.menuBar().addMenu(self.tr("&Query"))
+        query_menu.addAction(self._export_results)
+        query_menu.addSeparator()
+        query_menu.addAction(self._query_timeout)
+        query_menu.addAction(self._columnar_results)
+        query_menu.addAction(self._clear_cache)
+
+        profile_menu = query_menu.addMenu(self.tr("Connection &Profile"))
+        self._profiles = QActionGroup(self)
+        for name in PROFILES:
+            action = QAction(name, self, checkable=True,
+                             checked=name == self.database.profile)
+            action.setData(name)
+            self._profiles.addAction(action)
+            profile_menu.addAction(action)
+        self._profiles.triggered.connect(self.setProfile)
+
+    def wordsFromFile(self, fileName: str) -> list:
         f = QFile(fileName)
         if not f.open(QFile.ReadOnly):
-            return QStringListModel(self.completer)
-
-        QApplication.setOverrideCursor(QCursor(Qt.WaitCursor))
-
-        words = []
-        while not f.atEnd():
-            line = f.readLine().trimmed()
-            if line.length() != 0:
-                try:
-                    line = str(line, encoding='ascii')
-                except TypeError:
-                    line = str(line)
-
-                words.append(line)
-
-        QApplication.restoreOverrideCursor()
-
-        return QStringListModel(words, self.completer)
+            return []
+        # One word per line, read at once
+        text = bytes(f.readAll()).decode('ascii', errors='ignore')
+        f.close()
+        return [line.strip() for line in text.splitlines() if line.strip()]
 
     def about(self):
         QMessageBox.about(self, "About",
@@ -884,6 +1301,11 @@ class ExecuteApp():
         import sys
 
         app = QApplication(sys.argv)
+        # Before the window exists, setting it later polishes every widget again
+        with open('style.qss', 'r') as qss:
+            _style = qss.read()
+            app.setStyleSheet(_style)
+
         window = MainWindow()
         window.resize(1200,600)
         window.show()
@@ -891,10 +1313,6 @@ class ExecuteApp():
             print(fspath(Path(self.file).resolve()))
             window.openFile(fspath(Path(self.file).resolve()))
 
-        with open('style.qss', 'r') as qss:
-            _style = qss.read()
-            app.setStyleSheet(_style)
-
         sys.exit(app.exec())
 
 if __name__ == '__main__':
@@ -8,51 +8,133 @@ from PySide6.QtCore import (
     Qt,
     QAbstractTableModel,
     QModelIndex )
-import time
+from itertools import islice
+
+import sqlite3
+
+try:
+    from .result_store import ColumnStore
+except ImportError:
+    # sqlcode_editor.py executed as a script
+    from result_store import ColumnStore
 
 class CustomTableView(QAbstractTableModel):
 
     ROW_BATCH_COUNT = 15
 
-    def __init__(self, data=None):
+    def __init__(self, data=None, columnar: bool=False, pager=None):
+        """
+        data: tuple (headers, cursor) or (headers, cursor, first_rows)
+        columnar: bool (store rows in a result_store.ColumnStore)
+        pager: object with fetchRows(cursor, count, callback) and
+               closeCursor(cursor) (MainWindow), None -> fetch in place
+
+        Rows are pulled from the live cursor with fetchmany() as the view
+        scrolls, only the rows already shown are kept in memory. With a
+        pager the pages are fetched off the GUI thread, callback(cursor,
+        rows) adds them once they arrive.
+        """
         super().__init__()
-        # Load 15 row while user scroll down to a large set of records
-        self.rowsLoaded = CustomTableView.ROW_BATCH_COUNT
+        self.cursor = None
+        self.columnar = columnar
+        self.pager = pager
+        self.fetching = False
         self.load_data(data)
 
     def load_data(self, data):
         self.beginResetModel()
-        st = time.time()
+        self.close()
         self.headers = data[0]
-        self.records = [r for r in data[1]]
-        et = time.time()
-        elapsed_time = et - st
-        print(f'{elapsed_time=}')
+        self.cursor = data[1]
         self.column_count = len(self.headers)
-        self.row_count = len(self.records)
-        print(f'\nROWS: {self.row_count}')
-        print(f'COLUMNS: {self.column_count}\n')
+        self.column_types = [COLUMN_NULL] * self.column_count
+        self._roles = {
+                role: [handlers[COLUMN_NULL]] * self.column_count
+                for role, handlers in _ROLE_HANDLERS.items()
+                }
+        if self.columnar:
+            self.records = ColumnStore(len(self.headers))
+            self.value_at = self.records.value
+        else:
+            self.records = []
+            self.value_at = self._row_value
+        self.exhausted = False
+        # Load 15 row while user scroll down to a large set of records
+        if len(data) > 2:
+            self._add_rows(list(data[2]))
+        else:
+            self._add_rows(self._fetch_rows(CustomTableView.ROW_BATCH_COUNT))
         self.endResetModel()
 
+    def _fetch_rows(self, count: int) -> list:
+        try:
+            if hasattr(self.cursor, 'fetchmany'):
+                return self.cursor.fetchmany(count)
+            return list(islice(self.cursor, count))
+        except sqlite3.Error as e:
+            print(f'{str(e).title()}')
+            return []
+
+    def _add_rows(self, rows: list) -> None:
+        if len(rows) < CustomTableView.ROW_BATCH_COUNT:
+            self.exhausted = True
+            self.close()
+        if rows:
+            self._infer_types(rows)
+        self.records.extend(rows)
+
+    def _row_value(self, row: int, column: int):
+        return self.records[row][column]
+
+    def close(self) -> None:
+        """Close the cursor, no more rows can be fetched"""
+        if self.cursor is not None and hasattr(self.cursor, 'close'):
+            if self.pager is not None:
+                # After the page being fetched, on the same thread
+                self.pager.closeCursor(self.cursor)
+            else:
+                self.cursor.close()
+        self.cursor = None
+        self.exhausted = True
+        self.fetching = False
+
+    def total_count(self):
+        """Number of rows of the result set, None until the cursor is exhausted"""
+        if self.exhausted:
+            return len(self.records)
+        return None
+
     def rowCount(self, parent=QModelIndex()):
-        # Return rowsLoaded if the records is greater than ROW_BATCH_COUNT
-        if self.row_count <= self.rowsLoaded:
-            return self.row_count
-        return self.rowsLoaded
-        #return self.row_count
+        return len(self.records)
 
     def canFetchMore(self,index=QModelIndex()):
-        # return True if the records is greater than ROW_BATCH_COUNT
-        if self.row_count > self.rowsLoaded:
-            return True
-        return False
+        # return True while the cursor has not been exhausted and no page
+        # is on its way
+        return not self.exhausted and not self.fetching
 
     def fetchMore(self,index=QModelIndex()):
-        reminder = self.row_count - self.rowsLoaded # query records - ROW_BATCH_COUNT
-        itemsToFetch = min(reminder,CustomTableView.ROW_BATCH_COUNT)
-        self.beginInsertRows(QModelIndex(),self.rowsLoaded,self.rowsLoaded+itemsToFetch-1)
-        self.rowsLoaded += itemsToFetch
-        self.endInsertRows()
+        if self.pager is not None:
+            self.fetching = True
+            self.pager.fetchRows(
+                    self.cursor, CustomTableView.ROW_BATCH_COUNT, self._rows_fetched)
+            return
+        self._insert_rows(self._fetch_rows(CustomTableView.ROW_BATCH_COUNT))
+
+    def _rows_fetched(self, cursor, rows: list) -> None:
+        if cursor is not self.cursor:
+            # Closed or reloaded while the page was fetched
+            return
+        self.fetching = False
+        self._insert_rows(rows)
+
+    def _insert_rows(self, rows: list) -> None:
+        first = len(self.records)
+        if rows:
+            self.beginInsertRows(QModelIndex(),first,first+len(rows)-1)
+            self._add_rows(rows)
+            self.endInsertRows()
+        else:
+            self._add_rows(rows)
 
     def columnCount(self, parent=QModelIndex):
         return self.column_count
@@ -63,35 +145,147 @@ class CustomTableView(QAbstractTableModel):
                 return self.headers[section]
             return f'{section+1}'
 
+    def _infer_types(self, rows: list) -> None:
+        """Update the column types with a new batch of rows"""
+        changed = False
+        for column, values in enumerate(zip(*rows)):
+            current = self.column_types[column]
+            if current == COLUMN_MIXED:
+                continue
+            for value_type in set(map(type, values)):
+                kind = _COLUMN_TYPES.get(value_type, COLUMN_MIXED)
+                if kind == COLUMN_NULL or kind == current:
+                    continue
+                current = kind if current == COLUMN_NULL else COLUMN_MIXED
+            if current != self.column_types[column]:
+                self.column_types[column] = current
+                changed = True
+        if changed:
+            self._roles = {
+                    role: [handlers[kind] for kind in self.column_types]
+                    for role, handlers in _ROLE_HANDLERS.items()
+                    }
+
     def data(self, index, role):
+        # Role handlers are picked per column at load time (see
+        # _infer_types), no per-cell type dispatch while painting
+        handlers = self._roles.get(role)
+        if handlers is None:
+            return None
         column = index.column()
-        row = index.row()
-        self.value = self.records[row][column]
-
-        # Text Color 'Foreground'
-        if role == Qt.ForegroundRole:
-            if isinstance(self.value, int) or isinstance(self.value, float):
-                if self.value <= 0:
-                    return QtGui.QColor('red')
-            elif isinstance(self.value, datetime.datetime):
-                return QtGui.QColor('blue')
-            else:
-                return QtGui.QColor('#1c1b1c')
+        return handlers[column](self.value_at(index.row(), column))
 
-        # Field 'Background'
-        if role == Qt.BackgroundRole:
-            if self.value == None or self.value == '':
-                return QtGui.QColor('darkgray')
+# Column types, inferred from the fetched rows
+COLUMN_NULL = 0     # only NULLs so far
+COLUMN_INT = 1
+COLUMN_REAL = 2
+COLUMN_TEXT = 3
+COLUMN_DATETIME = 4
+COLUMN_MIXED = 5
 
-        # Row Alignment
-        if role == Qt.TextAlignmentRole:
-            if isinstance(self.value, int):
-                return Qt.AlignVCenter + Qt.AlignRight
+_COLUMN_TYPES = {
+        type(None): COLUMN_NULL,
+        int: COLUMN_INT,
+        float: COLUMN_REAL,
+        str: COLUMN_TEXT,
+        bytes: COLUMN_TEXT,
+        datetime.datetime: COLUMN_DATETIME,
+        }
 
-        if role == Qt.DisplayRole:
-            if isinstance(self.value, datetime.datetime):
-                self.value = str(self.value)
-            return self.value
+# Shared QColor/alignment objects, never allocated per cell
+FOREGROUND_NEGATIVE = QtGui.QColor('red')
+FOREGROUND_DATETIME = QtGui.QColor('blue')
+FOREGROUND_DEFAULT = QtGui.QColor('#1c1b1c')
+BACKGROUND_EMPTY = QtGui.QColor('darkgray')
+ALIGN_NUMBER = Qt.AlignVCenter | Qt.AlignRight
+
+# Text Color 'Foreground'
+def _foreground_number(value):
+    if value is None:
+        return FOREGROUND_DEFAULT
+    if value <= 0:
+        return FOREGROUND_NEGATIVE
+
+def _foreground_datetime(value):
+    if value is None:
+        return FOREGROUND_DEFAULT
+    return FOREGROUND_DATETIME
+
+def _foreground_default(value):
+    return FOREGROUND_DEFAULT
+
+def _foreground_mixed(value):
+    if isinstance(value, int) or isinstance(value, float):
+        if value <= 0:
+            return FOREGROUND_NEGATIVE
+    elif isinstance(value, datetime.datetime):
+        return FOREGROUND_DATETIME
+    else:
+        return FOREGROUND_DEFAULT
+
+# Field 'Background'
+def _background_number(value):
+    if value is None:
+        return BACKGROUND_EMPTY
+
+def _background_text(value):
+    if value is None or value == '':
+        return BACKGROUND_EMPTY
+
+# Row Alignment
+def _alignment_int(value):
+    if value is not None:
+        return ALIGN_NUMBER
+
+def _alignment_none(value):
+    return None
+
+def _alignment_mixed(value):
+    if isinstance(value, int):
+        return ALIGN_NUMBER
+
+def _display(value):
+    return value
+
+def _display_datetime(value):
+    if isinstance(value, datetime.datetime):
+        return str(value)
+    return value
+
+_ROLE_HANDLERS = {
+        Qt.ForegroundRole: {
+            COLUMN_NULL: _foreground_default,
+            COLUMN_INT: _foreground_number,
+            COLUMN_REAL: _foreground_number,
+            COLUMN_TEXT: _foreground_default,
+            COLUMN_DATETIME: _foreground_datetime,
+            COLUMN_MIXED: _foreground_mixed,
+            },
+        Qt.BackgroundRole: {
+            COLUMN_NULL: _background_number,
+            COLUMN_INT: _background_number,
+            COLUMN_REAL: _background_number,
+            COLUMN_TEXT: _background_text,
+            COLUMN_DATETIME: _background_number,
+            COLUMN_MIXED: _background_text,
+            },
+        Qt.TextAlignmentRole: {
+            COLUMN_NULL: _alignment_none,
+            COLUMN_INT: _alignment_int,
+            COLUMN_REAL: _alignment_none,
+            COLUMN_TEXT: _alignment_none,
+            COLUMN_DATETIME: _alignment_none,
+            COLUMN_MIXED: _alignment_mixed,
+            },
+        Qt.DisplayRole: {
+            COLUMN_NULL: _display,
+            COLUMN_INT: _display,
+            COLUMN_REAL: _display,
+            COLUMN_TEXT: _display,
+            COLUMN_DATETIME: _display_datetime,
+            COLUMN_MIXED: _display_datetime,
+            },
+        }
 
 if __name__ == "__main__":
     print('Local [TEST]')
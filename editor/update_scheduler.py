@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+
+# This Python file uses the following encoding: utf-8
+
+from PySide6.QtCore import (
+        QObject,
+        QTimer,
+        Slot)
+
+class UpdateScheduler(QObject):
+    def __init__(self, parent=None):
+        """
+        Coalesce editor updates: signals only mark a task dirty, a single
+        shot 0 ms timer runs every dirty task once, after the event loop
+        has processed the pending events. Pasting a script fires
+        textChanged/cursorPositionChanged many times but the line numbers,
+        the current line and the completer are updated once.
+        """
+        super().__init__(parent)
+        self._tasks = {}
+        self._dirty = set()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self.flush)
+
+    def register(self, name: str, callback) -> None:
+        """Tasks run in registration order"""
+        self._tasks[name] = callback
+
+    def schedule(self, name: str) -> None:
+        self._dirty.add(name)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    @Slot()
+    def flush(self) -> None:
+        dirty = self._dirty
+        self._dirty = set()
+        for name, callback in self._tasks.items():
+            if name in dirty:
+                callback()
+
+if __name__ == "__main__":
+    print('Local [TEST]')
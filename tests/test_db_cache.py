@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+
+# This Python file uses the following encoding: utf-8
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from editor.db.db_cache import normalize_sql
+
+class TestNormalizeSql(unittest.TestCase):
+    def test_key(self):
+        self.assertEqual(normalize_sql("SELECT *\n  FROM Urls -- comment\nWHERE url LIKE '%A%'"),
+                         "select * from urls where url like '%A%'")
+
+    def test_clock_is_not_cached(self):
+        for sql in ("SELECT datetime('now')",
+                    'SELECT strftime("%H:%M:%f","now")',
+                    "SELECT date('NOW')",
+                    "SELECT datetime(last_visit_time, 'localtime') FROM urls",
+                    'SELECT unixepoch()',
+                    "SELECT strftime('%s')",
+                    'SELECT random()'):
+            self.assertEqual(normalize_sql(sql), '', sql)
+
+    def test_explicit_time_is_cached(self):
+        for sql in ("SELECT date('2024-01-01')",
+                    "SELECT strftime('%s', last_visit_time) FROM urls",
+                    "SELECT 'nowhere'"):
+            self.assertNotEqual(normalize_sql(sql), '', sql)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+
+# This Python file uses the following encoding: utf-8
+
+# python -m pytest tests (or python -m unittest discover -s tests -t .)
+
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from editor.db.db_metrics import metrics_log
+from editor.db.db_query import Query
+from editor.query_worker import QueryWorker
+
+ROWS = 100
+
+class QueryTestCase(unittest.TestCase):
+
+    # PRAGMA profile of the Query (db_profiles.py)
+    PROFILE = 'default'
+
+    def setUp(self):
+        metrics_log.enabled = False
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, 'test.db')
+        con = sqlite3.connect(path)
+        con.execute('CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)')
+        con.executemany('INSERT INTO t VALUES (?, ?)',
+                        ((i, f'row {i}') for i in range(ROWS)))
+        con.commit()
+        con.close()
+        self.query = Query(db=path, profile=self.PROFILE)
+
+    def tearDown(self):
+        self.query.close_connection()
+        self.directory.cleanup()
+        metrics_log.enabled = True
+
+    def run_worker(self, script: str) -> list:
+        """Run script through a QueryWorker, return (headers, rows) of every statement"""
+        results = []
+        errors = []
+        worker = QueryWorker(self.query, script, prefetch=15)
+        worker.signals.result.connect(results.append)
+        worker.signals.error.connect(lambda message, offset: errors.append(message))
+        self.query.reset_cancel()
+        worker.run()
+        self.assertEqual(errors, [])
+        out = []
+        for headers, cursor, rows in results:
+            # Page the rest as the result grid does
+            while True:
+                batch = cursor.fetchmany(15)
+                rows += batch
+                if len(batch) < 15:
+                    break
+            out.append((headers, rows, cursor.metrics.cached))
+            cursor.close()
+        return out
+
+class TestResultCache(QueryTestCase):
+    def test_large_result_hits_the_cache(self):
+        # More rows than prefetched: the result is paged on a detached reader
+        first = self.run_worker('SELECT * FROM t;')
+        second = self.run_worker('SELECT * FROM t;')
+        self.assertEqual(len(first[0][1]), ROWS)
+        self.assertFalse(first[0][2])
+        self.assertTrue(second[0][2])
+        self.assertEqual(second[0][1], first[0][1])
+
+    def test_write_invalidates_the_cache(self):
+        self.run_worker('SELECT count(*) FROM t;')
+        out = self.run_worker('DELETE FROM t WHERE id < 10;\nSELECT count(*) FROM t;')
+        self.assertEqual(out[-1][1], [(ROWS - 10,)])
+        self.assertFalse(out[-1][2])
+
+    def test_interrupted_result_is_not_cached(self):
+        # A page cut short by the timeout or Cancel (FetchWorker)
+        headers, cursor = self.query.execute_statement('SELECT * FROM t')
+        self.assertEqual(len(cursor.fetchmany(15)), 15)
+        self.query.cancel()
+        with self.assertRaises(sqlite3.OperationalError):
+            cursor.fetchmany(ROWS)
+        self.query.reset_cancel()
+        cursor.fetchmany(15)
+        cursor.close()
+        out = self.run_worker('SELECT * FROM t;')
+        self.assertEqual(len(out[0][1]), ROWS)
+        self.assertFalse(out[0][2])
+
+class TestWriteRouting(QueryTestCase):
+
+    # Read connections are query_only, a write sent to one fails
+    PROFILE = 'analytics'
+
+    def test_with_insert_runs_on_the_writer(self):
+        self.run_worker('SELECT count(*) FROM t;')
+        out = self.run_worker(
+                "WITH n(id) AS (VALUES (1000), (1001)) "
+                "INSERT INTO t SELECT id, 'cte' FROM n;\n"
+                "SELECT count(*) FROM t;")
+        self.assertEqual(out[-1][1], [(ROWS + 2,)])
+        self.assertFalse(out[-1][2])
+
+    def test_open_result_does_not_lock_the_writes(self):
+        # The first result is left open on its connection (paged later)
+        results = []
+        errors = []
+        worker = QueryWorker(self.query,
+                             'SELECT * FROM t;\nDELETE FROM t WHERE id < 10;\n'
+                             'SELECT count(*) FROM t;', prefetch=15)
+        worker.signals.result.connect(results.append)
+        worker.signals.error.connect(lambda message, offset: errors.append(message))
+        self.query.reset_cancel()
+        worker.run()
+        self.assertEqual(errors, [])
+        self.assertEqual(results[-1][2], [(ROWS - 10,)])
+        for headers, cursor, rows in results:
+            cursor.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+
+# This Python file uses the following encoding: utf-8
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from editor.db.sql_lexer import split_statements, statement_keyword
+
+class TestSplitStatements(unittest.TestCase):
+    def test_trigger_ends_with_end(self):
+        script = ("CREATE TEMP TRIGGER log AFTER INSERT ON t BEGIN\n"
+                  "  INSERT INTO log VALUES (CASE WHEN 1 THEN 'a;' END);\n"
+                  "  DELETE FROM t;\n"
+                  "END;\n"
+                  "SELECT 1;")
+        statements = split_statements(script)
+        self.assertEqual([statement.line for statement in statements], [1, 5])
+        self.assertTrue(statements[0].sql.endswith('END'))
+
+    def test_unterminated_trigger(self):
+        script = 'CREATE TRIGGER t AFTER INSERT ON t BEGIN SELECT 1; SELECT 2;'
+        self.assertEqual([statement.sql for statement in split_statements(script)], [script])
+
+    def test_trigger_names_are_not_triggers(self):
+        script = 'CREATE TABLE trigger_log (a); SELECT "end"; SELECT 2;'
+        self.assertEqual(len(split_statements(script)), 3)
+
+class TestStatementKeyword(unittest.TestCase):
+    def test_with(self):
+        self.assertEqual(statement_keyword('WITH x AS (SELECT 1) INSERT INTO t SELECT * FROM x'),
+                         'insert')
+        self.assertEqual(statement_keyword('with recursive c(n) as (select 1) select n from c'),
+                         'select')
+        self.assertEqual(statement_keyword('-- comment\nUPDATE t SET a = 1'), 'update')
+
+if __name__ == "__main__":
+    unittest.main()